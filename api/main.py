@@ -2,17 +2,43 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
+import asyncio
+import logging
+import queue
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
 from api.routes import chat, audio, health
 from api.middleware.error_handler import setup_error_handlers
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+def start_log_listener() -> QueueListener:
+    """Hand log records to a queue so formatting and stream writes happen on a background thread"""
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+async def sweep_expired_messages():
+    """Periodically delete the messages of conversations expired by the TTL index"""
+    while True:
+        await asyncio.sleep(settings.MESSAGE_SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(chat.mongodb_manager.purge_orphaned_messages)
+        except Exception:
+            logger.exception("Message sweep error")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
+    log_listener = start_log_listener()
     print("Starting Medical Chatbot API...")
     print(f"Debug mode: {settings.DEBUG}")
     print(f"Using CUDA: {settings.USE_CUDA}")
@@ -20,11 +46,24 @@ async def lifespan(app: FastAPI):
     # Initialize services here if needed
     # await initialize_services()
     
+    # Move messages embedded in older conversations before the message routes read them
+    try:
+        await run_in_threadpool(chat.mongodb_manager.migrate_legacy_messages)
+    except Exception:
+        logger.exception("Message migration error")
+    
+    sweep_task = None
+    if settings.CONVERSATION_TTL_SECONDS:
+        sweep_task = asyncio.create_task(sweep_expired_messages())
+    
     yield
     
     # Shutdown
     print("Shutting down Medical Chatbot API...")
+    if sweep_task is not None:
+        sweep_task.cancel()
     # Cleanup code here
+    log_listener.stop()
 
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
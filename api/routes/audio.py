@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
-import io
 
 from src.audio.whisper_stt import WhisperSTT
 from src.audio.elevenlabs_tts import ElevenLabsTTS
@@ -78,17 +78,16 @@ async def synthesize_speech(
         result = elevenlabs_tts.text_to_speech(
             text=text,
             voice=voice,
-            model_id=model
+            model_id=model,
+            stream=True
         )
         
         if not result['success']:
             raise HTTPException(status_code=400, detail=f"Speech synthesis failed: {result['error']}")
         
-        # Return audio as streaming response
-        audio_stream = io.BytesIO(result['audio_data'])
-        
+        # Relay audio chunks to the client as they arrive from the API
         return StreamingResponse(
-            io.BytesIO(result['audio_data']),
+            result['audio_iter'],
             media_type=result['content_type'],
             headers={
                 "Content-Disposition": "attachment; filename=speech.mp3",
@@ -278,29 +277,19 @@ async def batch_synthesize_speech(
     try:
         results = []
         
-        for i, text in enumerate(texts):
-            try:
-                result = elevenlabs_tts.text_to_speech(
-                    text=text,
-                    voice=voice,
-                    model_id=model
-                )
-                
-                results.append({
-                    "index": i,
-                    "text": text,
-                    "success": result['success'],
-                    "audio_size": len(result['audio_data']) if result['success'] else 0,
-                    "error": result.get('error')
-                })
-                
-            except Exception as e:
-                results.append({
-                    "index": i,
-                    "text": text,
-                    "success": False,
-                    "error": str(e)
-                })
+        # Synthesize all texts concurrently, off the event loop
+        batch_results = await run_in_threadpool(
+            elevenlabs_tts.synthesize_speech_batch, texts, voice, model
+        )
+        
+        for i, (text, result) in enumerate(zip(texts, batch_results)):
+            results.append({
+                "index": i,
+                "text": text,
+                "success": result['success'],
+                "audio_size": len(result['audio_data']) if result['success'] else 0,
+                "error": result.get('error')
+            })
         
         return {
             "results": results,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, List, Optional
 import json
@@ -31,7 +32,7 @@ image_processor = ImageProcessor()
 audio_processor = AudioProcessor()
 multilingual_processor = MultilingualProcessor()
 mongodb_manager = MongoDBManager()
-pinecone_manager = PineconeManager()
+pinecone_manager = PineconeManager(metadata_store=mongodb_manager.vector_metadata)
 
 # Initialize RAG system (this would be loaded from your knowledge base)
 # For demo purposes, we'll use a simple in-memory system
@@ -124,9 +125,10 @@ async def chat_with_text(
         
         # Store conversation
         if not conversation_id:
-            conversation_id = mongodb_manager.create_conversation(user_id, session_id, message)
+            conversation_id = await run_in_threadpool(mongodb_manager.create_conversation, user_id, session_id, message)
         
-        message_id = mongodb_manager.add_message(
+        message_id = await run_in_threadpool(
+            mongodb_manager.add_message,
             conversation_id,
             final_response,
             "assistant",
@@ -150,7 +152,7 @@ async def chat_with_text(
             },
             "emergency": {
                 "is_emergency": emergency_detection.is_emergency,
-                "level": emergency_detection.level.value,
+                "level": emergency_detection.level.label,
                 "recommended_actions": emergency_detection.recommended_actions
             },
             "emotion": {
@@ -265,7 +267,7 @@ async def get_conversation(conversation_id: str) -> Dict[str, Any]:
     Get conversation history
     """
     try:
-        conversation = mongodb_manager.get_conversation(conversation_id)
+        conversation = await run_in_threadpool(mongodb_manager.get_conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
@@ -278,22 +280,34 @@ async def get_conversation(conversation_id: str) -> Dict[str, Any]:
 async def get_conversation_messages(
     conversation_id: str,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    after: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Get messages from a conversation
+    
+    Pass the last message_id of the previous page as `after` to page by key instead of offset.
     """
     try:
-        messages = mongodb_manager.get_conversation_messages(conversation_id, limit, offset)
+        if after:
+            messages = await run_in_threadpool(mongodb_manager.get_conversation_messages_after, conversation_id, after, limit)
+            if messages is None:
+                raise HTTPException(status_code=404, detail="Message to page after not found in conversation")
+        else:
+            messages = await run_in_threadpool(mongodb_manager.get_conversation_messages, conversation_id, limit, offset)
         
         return {
             "conversation_id": conversation_id,
             "messages": messages,
             "limit": limit,
             "offset": offset,
+            "after": after,
+            "next_after": messages[-1]['message_id'] if messages else None,
             "total": len(messages)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving messages: {str(e)}")
 
@@ -303,7 +317,7 @@ async def delete_conversation(conversation_id: str) -> Dict[str, Any]:
     Delete a conversation
     """
     try:
-        success = mongodb_manager.delete_conversation(conversation_id)
+        success = await run_in_threadpool(mongodb_manager.delete_conversation, conversation_id)
         if not success:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
@@ -331,7 +345,8 @@ async def submit_feedback(
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        feedback_id = mongodb_manager.store_user_feedback(
+        feedback_id = await run_in_threadpool(
+            mongodb_manager.store_user_feedback,
             conversation_id, message_id, feedback_data
         )
         
@@ -382,7 +397,7 @@ async def analyze_text(
             emergency_detection = emergency_detector.detect_emergency(text)
             result["emergency"] = {
                 "is_emergency": emergency_detection.is_emergency,
-                "level": emergency_detection.level.value,
+                "level": emergency_detection.level.label,
                 "confidence": emergency_detection.confidence,
                 "recommended_actions": emergency_detection.recommended_actions
             }
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 import asyncio
 from datetime import datetime
@@ -12,8 +13,8 @@ from src.translation.multilingual import MultilingualProcessor
 router = APIRouter()
 
 # Initialize services
-pinecone_manager = PineconeManager()
 mongodb_manager = MongoDBManager()
+pinecone_manager = PineconeManager(metadata_store=mongodb_manager.vector_metadata)
 whisper_stt = WhisperSTT()
 elevenlabs_tts = ElevenLabsTTS()
 multilingual_processor = MultilingualProcessor()
@@ -54,7 +55,7 @@ async def detailed_health_check() -> Dict[str, Any]:
     
     # Check MongoDB
     try:
-        mongodb_health = mongodb_manager.health_check()
+        mongodb_health = await run_in_threadpool(mongodb_manager.health_check)
         health_status["services"]["mongodb"] = mongodb_health
     except Exception as e:
         health_status["services"]["mongodb"] = {
@@ -127,7 +128,7 @@ async def services_status() -> Dict[str, Any]:
     
     # MongoDB status
     try:
-        mongodb_stats = mongodb_manager.get_database_stats()
+        mongodb_stats = await run_in_threadpool(mongodb_manager.get_database_stats)
         services["mongodb"] = {
             "status": "connected",
             "database_stats": mongodb_stats
@@ -180,7 +181,7 @@ async def readiness_check() -> Dict[str, Any]:
         
         for service in critical_services:
             if service == "mongodb":
-                health = mongodb_manager.health_check()
+                health = await run_in_threadpool(mongodb_manager.health_check)
             elif service == "pinecone":
                 health = pinecone_manager.health_check()
             
@@ -240,7 +241,7 @@ async def get_metrics() -> Dict[str, Any]:
     
     try:
         # MongoDB metrics
-        mongodb_stats = mongodb_manager.get_database_stats()
+        mongodb_stats = await run_in_threadpool(mongodb_manager.get_database_stats)
         metrics["services"]["mongodb"] = {
             "collections": mongodb_stats.get("collections", 0),
             "documents": mongodb_stats.get("objects", 0),
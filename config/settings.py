@@ -25,6 +25,7 @@ class Settings:
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4")
     TTS_VOICE: str = os.getenv("TTS_VOICE", "alloy")
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", os.path.expanduser("~/.cache/elevenlabs_tts"))
     
     # Confidence Thresholds
     CONFIDENCE_THRESHOLD: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.6"))
@@ -36,6 +37,12 @@ class Settings:
     # MongoDB Settings
     MONGO_DATABASE: str = os.getenv("MONGO_DATABASE", "medical_chatbot")
     MONGO_COLLECTION: str = os.getenv("MONGO_COLLECTION", "conversations")
+    MONGO_POOL_SIZE: int = int(os.getenv("MONGO_POOL_SIZE", "200"))
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "zlib")
+    # Seconds of inactivity after which MongoDB expires a conversation (0 disables expiry)
+    CONVERSATION_TTL_SECONDS: int = int(os.getenv("CONVERSATION_TTL_SECONDS", "2592000"))
+    # Seconds between sweeps deleting the messages of expired conversations
+    MESSAGE_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("MESSAGE_SWEEP_INTERVAL_SECONDS", "3600"))
 
 settings = Settings()
 
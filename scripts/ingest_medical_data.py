@@ -110,7 +110,9 @@ def ingest_to_pinecone(vector_documents: List[VectorDocument], batch_size: int =
     
     print("Ingesting documents to Pinecone...")
     
-    pinecone_manager = PineconeManager()
+    # Vector metadata is mirrored to MongoDB for metadata-only searches
+    mongodb_manager = MongoDBManager()
+    pinecone_manager = PineconeManager(metadata_store=mongodb_manager.vector_metadata)
     
     if not pinecone_manager.index:
         print("❌ Pinecone not initialized. Please run setup_databases.py first.")
@@ -149,13 +151,10 @@ def ingest_to_mongodb(documents: List[Dict[str, Any]]):
     
     success_count = 0
     
-    for doc in documents:
-        try:
-            doc_id = mongodb_manager.store_medical_data(doc, "medical_knowledge")
-            if doc_id:
-                success_count += 1
-        except Exception as e:
-            print(f"❌ Error storing document: {e}")
+    try:
+        success_count = len(mongodb_manager.store_medical_data_bulk(documents, "medical_knowledge"))
+    except Exception as e:
+        print(f"❌ Error storing documents: {e}")
     
     print(f"✅ Successfully ingested {success_count}/{len(documents)} documents to MongoDB")
     return success_count == len(documents)
@@ -25,8 +25,8 @@ class DatasetManager:
     """Manages medical datasets for the chatbot"""
     
     def __init__(self):
-        self.pinecone_manager = PineconeManager()
         self.mongodb_manager = MongoDBManager()
+        self.pinecone_manager = PineconeManager(metadata_store=self.mongodb_manager.vector_metadata)
         self.embedding_model = EmbeddingModel()
     
     def load_dataset(self, file_path: str) -> List[Dict[str, Any]]:
@@ -133,12 +133,11 @@ class DatasetManager:
         
         # Add to MongoDB
         mongodb_success = True
-        for doc in documents:
-            try:
-                self.mongodb_manager.store_medical_data(doc, "medical_knowledge")
-            except Exception as e:
-                print(f"❌ Failed to store document in MongoDB: {e}")
-                mongodb_success = False
+        try:
+            self.mongodb_manager.store_medical_data_bulk(documents, "medical_knowledge")
+        except Exception as e:
+            print(f"❌ Failed to store documents in MongoDB: {e}")
+            mongodb_success = False
         
         if pinecone_success and mongodb_success:
             print(f"✅ Successfully added {len(documents)} documents")
@@ -291,12 +290,11 @@ class DatasetManager:
         
         # Add to MongoDB
         mongodb_success = True
-        for doc in documents:
-            try:
-                self.mongodb_manager.store_medical_data(doc, "medical_knowledge")
-            except Exception as e:
-                print(f"❌ Failed to store document: {e}")
-                mongodb_success = False
+        try:
+            self.mongodb_manager.store_medical_data_bulk(documents, "medical_knowledge")
+        except Exception as e:
+            print(f"❌ Failed to store documents: {e}")
+            mongodb_success = False
         
         return pinecone_success and mongodb_success
 
@@ -20,7 +20,9 @@ async def setup_pinecone():
     """Setup Pinecone vector database"""
     print("Setting up Pinecone...")
     
-    pinecone_manager = PineconeManager()
+    # Vector metadata is mirrored to MongoDB for metadata-only searches
+    mongodb_manager = MongoDBManager()
+    pinecone_manager = PineconeManager(metadata_store=mongodb_manager.vector_metadata)
     
     # Check if index exists
     if pinecone_manager.index is None:
@@ -42,6 +44,11 @@ async def setup_pinecone():
         print("❌ Pinecone connection failed")
         return False
     
+    # Mirror the metadata of vectors upserted before the mirror existed
+    if mongodb_manager.vector_metadata is not None:
+        mirrored = pinecone_manager.backfill_metadata_store()
+        print(f"✅ Mirrored metadata of {mirrored} vectors to MongoDB")
+    
     return True
 
 async def setup_mongodb():
@@ -60,6 +67,10 @@ async def setup_mongodb():
         mongodb_manager.create_indexes()
         print("✅ MongoDB indexes created")
         
+        # Move messages embedded in older conversations to the messages collection
+        migrated = mongodb_manager.migrate_legacy_messages()
+        print(f"✅ Migrated messages of {migrated} conversations")
+        
         return True
     else:
         print("❌ MongoDB connection failed")
@@ -117,8 +128,10 @@ async def create_sample_data():
         }
     ]
     
+    mongodb_manager = MongoDBManager()
+    
     # Add to Pinecone
-    pinecone_manager = PineconeManager()
+    pinecone_manager = PineconeManager(metadata_store=mongodb_manager.vector_metadata)
     if pinecone_manager.index:
         from src.database.pinecone_manager import VectorDocument
         import uuid
@@ -144,10 +157,8 @@ async def create_sample_data():
             print("❌ Failed to add sample data to Pinecone")
     
     # Add to MongoDB
-    mongodb_manager = MongoDBManager()
     if mongodb_manager.client:
-        for doc in sample_documents:
-            mongodb_manager.store_medical_data(doc, "medical_knowledge")
+        mongodb_manager.store_medical_data_bulk(sample_documents, "medical_knowledge")
         print("✅ Sample data added to MongoDB")
     
     return True
@@ -1,33 +1,52 @@
 import re
+import sys
 import numpy as np
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, NamedTuple, Optional, Set, Tuple
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
+from .keyword_scanner import KeywordScanner
 
-class EmergencyLevel(Enum):
-    """Emergency severity levels"""
-    NONE = "none"
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
+class EmergencyLevel(IntEnum):
+    """Emergency severity levels, ordered so levels compare as plain ints"""
+    NONE = 0
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    CRITICAL = 4
+    
+    @property
+    def label(self) -> str:
+        """Lowercase level name used in API responses"""
+        return self.name.lower()
 
-@dataclass
+@dataclass(frozen=True)
 class EmergencyDetection:
-    """Represents emergency detection results"""
+    """Represents emergency detection results (immutable and hashable)"""
+    __slots__ = ('is_emergency', 'level', 'confidence', 'indicators',
+                 'recommended_actions', 'urgency_score', 'medical_priority')
+    
     is_emergency: bool
     level: EmergencyLevel
     confidence: float
-    indicators: List[str]
-    recommended_actions: List[str]
+    indicators: Tuple[str, ...]
+    recommended_actions: Tuple[str, ...]
     urgency_score: float
     medical_priority: str
 
+class AnalyzeResult(NamedTuple):
+    """Per-category scores with the aggregates downstream scoring needs"""
+    scores: Dict[str, float]
+    max_score: float
+    strong_count: int  # categories scoring above 0.3
+
 class EmergencyDetector:
     """
     Advanced emergency detection for medical chatbot
     """
     
+    # Critical pattern score at which detection stops and reports CRITICAL
+    CRITICAL_SHORT_CIRCUIT_SCORE = 0.9
+    
     def __init__(self):
         """Initialize emergency detector"""
         # Critical emergency keywords and patterns
@@ -101,6 +120,109 @@ class EmergencyDetector:
             'action_indicators': ['call 911', 'emergency room', 'ambulance', 'help me'],
             'symptom_combinations': ['chest pain and shortness of breath', 'headache and fever']
         }
+        
+        # Base recommended actions per emergency level
+        self._actions_by_level: Dict[EmergencyLevel, Tuple[str, ...]] = {
+            EmergencyLevel.CRITICAL: (
+                "Call 911 immediately",
+                "Do not delay seeking emergency medical care",
+                "If unconscious, check for breathing and pulse",
+                "Stay with the person until help arrives"
+            ),
+            EmergencyLevel.HIGH: (
+                "Seek immediate medical attention",
+                "Go to the nearest emergency room",
+                "Call emergency services if symptoms worsen",
+                "Do not drive yourself if experiencing severe symptoms"
+            ),
+            EmergencyLevel.MEDIUM: (
+                "Schedule urgent medical consultation",
+                "Contact your healthcare provider immediately",
+                "Monitor symptoms closely",
+                "Go to urgent care if symptoms persist or worsen"
+            ),
+            EmergencyLevel.LOW: (
+                "Monitor symptoms",
+                "Contact healthcare provider if symptoms worsen",
+                "Consider urgent care if symptoms persist"
+            )
+        }
+        
+        # Single case-insensitive scanner over every keyword above
+        self._build_term_scanner()
+        self._build_term_targets()
+        self._build_batch_tables()
+    
+    def _build_term_scanner(self):
+        """Intern each keyword once and compile all of them into one case-insensitive scanner"""
+        term_ids = {}
+        
+        def index_terms(keywords):
+            return tuple(term_ids.setdefault(sys.intern(term), len(term_ids)) for term in keywords)
+        
+        # Categories refer to keywords by index into the master term table
+        self._critical_term_ids = {
+            pattern_name: {
+                bucket: index_terms(pattern_data[bucket])
+                for bucket in ('keywords', 'phrases', 'symptoms', 'severity_indicators')
+            }
+            for pattern_name, pattern_data in self.critical_patterns.items()
+        }
+        self._priority_term_ids = {
+            condition_name: {
+                bucket: index_terms(condition_data.get(bucket, ()))
+                for bucket in ('keywords', 'indicators', 'body_parts')
+            }
+            for condition_name, condition_data in self.high_priority_conditions.items()
+        }
+        self._urgency_term_ids = {
+            modifier_name: index_terms(indicators)
+            for modifier_name, indicators in self.urgency_modifiers.items()
+        }
+        self._terms: Tuple[str, ...] = tuple(term_ids)
+        
+        self._term_scanner = KeywordScanner(self._terms, ignore_case=True)
+    
+    def _build_term_targets(self):
+        """Map each term to every bucket it counts towards, so a hit fans out once"""
+        # Bucket slots are laid out category-major, bucket-minor: critical, priority, urgency
+        buckets = []
+        for pattern_ids in self._critical_term_ids.values():
+            buckets.extend(pattern_ids[bucket] for bucket in
+                           ('keywords', 'phrases', 'symptoms', 'severity_indicators'))
+        self._priority_slot_offset = len(buckets)
+        for condition_ids in self._priority_term_ids.values():
+            buckets.extend(condition_ids[bucket] for bucket in ('keywords', 'indicators', 'body_parts'))
+        self._urgency_slot_offset = len(buckets)
+        buckets.extend(self._urgency_term_ids.values())
+        self._inv_n_urgency = 1.0 / len(self._urgency_term_ids)
+        
+        term_slots = [[] for _ in self._terms]
+        for slot, term_ids in enumerate(buckets):
+            for term_id in term_ids:
+                term_slots[term_id].append(slot)
+        self._term_slots: Tuple[Tuple[int, ...], ...] = tuple(tuple(slots) for slots in term_slots)
+        self._n_bucket_slots = len(buckets)
+    
+    def _build_batch_tables(self):
+        """Build the term-to-bucket matrix used to score many texts at once"""
+        self._slot_matrix = np.zeros((len(self._terms), self._n_bucket_slots))
+        for term_id, slots in enumerate(self._term_slots):
+            self._slot_matrix[term_id, list(slots)] = 1.0
+        
+        self._priority_severity = np.array([
+            self.high_priority_conditions[condition_name]['severity']
+            for condition_name in self._priority_term_ids
+        ])
+    
+    def _count_bucket_hits(self, hits: Set[int]) -> List[int]:
+        """Count matched terms per bucket slot, visiting each hit term once"""
+        counts = [0] * self._n_bucket_slots
+        term_slots = self._term_slots
+        for term_id in hits:
+            for slot in term_slots[term_id]:
+                counts[slot] += 1
+        return counts
     
     def detect_emergency(self, text: str, context: str = "") -> EmergencyDetection:
         """
@@ -113,38 +235,45 @@ class EmergencyDetector:
         Returns:
             EmergencyDetection object
         """
-        text_lower = text.lower()
+        # Find all keywords in one case-insensitive pass over the original text
+        hits = self._term_scanner.scan(text)
+        counts = self._count_bucket_hits(hits)
         
         # Analyze critical patterns
-        critical_scores = self._analyze_critical_patterns(text_lower)
+        critical = self._analyze_critical_patterns(counts)
+        
+        # A saturated critical pattern mandates emergency care regardless of refinement
+        if critical.max_score >= self.CRITICAL_SHORT_CIRCUIT_SCORE:
+            top_pattern = max(critical.scores, key=critical.scores.get)
+            return self._critical_detection(hits, top_pattern, critical.max_score, context)
         
         # Analyze high priority conditions
-        priority_scores = self._analyze_priority_conditions(text_lower)
+        priority = self._analyze_priority_conditions(counts)
         
         # Calculate urgency modifiers
-        urgency_modifiers = self._calculate_urgency_modifiers(text_lower)
+        urgency_modifiers = self._calculate_urgency_modifiers(counts)
+        urgency_sum = sum(urgency_modifiers.values())
+        urgency_avg = urgency_sum * self._inv_n_urgency
         
         # Combine scores
         emergency_score = self._combine_emergency_scores(
-            critical_scores, priority_scores, urgency_modifiers
+            critical.max_score, priority.max_score, urgency_avg
         )
         
         # Determine emergency level
         level = self._determine_emergency_level(emergency_score)
         
         # Calculate confidence
-        confidence = self._calculate_emergency_confidence(
-            critical_scores, priority_scores, urgency_modifiers
-        )
+        confidence = self._calculate_emergency_confidence(critical, priority, urgency_sum)
         
         # Extract indicators
-        indicators = self._extract_emergency_indicators(text_lower, critical_scores, priority_scores)
+        indicators = self._extract_emergency_indicators(hits, critical.scores, priority.scores)
         
         # Generate recommended actions
         recommended_actions = self._generate_emergency_actions(level, indicators, context)
         
         # Calculate urgency score
-        urgency_score = self._calculate_urgency_score(emergency_score, urgency_modifiers)
+        urgency_score = self._calculate_urgency_score(emergency_score, urgency_avg)
         
         # Determine medical priority
         medical_priority = self._determine_medical_priority(level, indicators)
@@ -153,108 +282,107 @@ class EmergencyDetector:
             is_emergency=level != EmergencyLevel.NONE,
             level=level,
             confidence=confidence,
-            indicators=indicators,
-            recommended_actions=recommended_actions,
+            indicators=tuple(indicators),
+            recommended_actions=tuple(recommended_actions),
             urgency_score=urgency_score,
             medical_priority=medical_priority
         )
     
-    def _analyze_critical_patterns(self, text: str) -> Dict[str, float]:
+    def _critical_detection(self, hits: Set[int], pattern_name: str, score: float,
+                            context: str) -> EmergencyDetection:
+        """Build a critical detection from the single saturated pattern"""
+        indicators = self._extract_emergency_indicators(hits, {pattern_name: score}, {})
+        
+        return EmergencyDetection(
+            is_emergency=True,
+            level=EmergencyLevel.CRITICAL,
+            confidence=1.0,
+            indicators=tuple(indicators),
+            recommended_actions=tuple(
+                self._generate_emergency_actions(EmergencyLevel.CRITICAL, indicators, context)
+            ),
+            urgency_score=1.0,
+            medical_priority=self._determine_medical_priority(EmergencyLevel.CRITICAL, indicators)
+        )
+    
+    def _analyze_critical_patterns(self, counts: List[int]) -> AnalyzeResult:
         """Analyze critical emergency patterns"""
         scores = {}
+        max_score = 0.0
+        strong_count = 0
         
-        for pattern_name, pattern_data in self.critical_patterns.items():
+        for position, pattern_name in enumerate(self._critical_term_ids):
+            slot = 4 * position
             score = 0.0
             
             # Check keywords
-            keyword_matches = sum(1 for keyword in pattern_data['keywords'] if keyword in text)
-            score += keyword_matches * 0.3
+            score += counts[slot] * 0.3
             
             # Check phrases
-            phrase_matches = sum(1 for phrase in pattern_data['phrases'] if phrase in text)
-            score += phrase_matches * 0.4
+            score += counts[slot + 1] * 0.4
             
             # Check symptoms
-            symptom_matches = sum(1 for symptom in pattern_data['symptoms'] if symptom in text)
-            score += symptom_matches * 0.2
+            score += counts[slot + 2] * 0.2
             
             # Check severity indicators
-            severity_matches = sum(1 for indicator in pattern_data['severity_indicators'] if indicator in text)
-            score += severity_matches * 0.1
+            score += counts[slot + 3] * 0.1
             
             # Normalize score
-            scores[pattern_name] = min(1.0, score)
+            score = min(1.0, score)
+            scores[pattern_name] = score
+            max_score = max(max_score, score)
+            strong_count += score > 0.3
         
-        return scores
+        return AnalyzeResult(scores, max_score, strong_count)
     
-    def _analyze_priority_conditions(self, text: str) -> Dict[str, float]:
+    def _analyze_priority_conditions(self, counts: List[int]) -> AnalyzeResult:
         """Analyze high priority medical conditions"""
         scores = {}
+        max_score = 0.0
+        strong_count = 0
         
-        for condition_name, condition_data in self.high_priority_conditions.items():
+        for position, condition_name in enumerate(self._priority_term_ids):
+            slot = self._priority_slot_offset + 3 * position
             score = 0.0
             
             # Check keywords
-            keyword_matches = sum(1 for keyword in condition_data['keywords'] if keyword in text)
-            score += keyword_matches * 0.4
+            score += counts[slot] * 0.4
             
             # Check specific indicators
-            if 'indicators' in condition_data:
-                indicator_matches = sum(1 for indicator in condition_data['indicators'] if indicator in text)
-                score += indicator_matches * 0.3
+            score += counts[slot + 1] * 0.3
             
             # Check body parts for pain conditions
-            if 'body_parts' in condition_data:
-                body_part_matches = sum(1 for part in condition_data['body_parts'] if part in text)
-                score += body_part_matches * 0.2
+            score += counts[slot + 2] * 0.2
             
             # Apply severity multiplier
-            score *= condition_data['severity']
+            score *= self.high_priority_conditions[condition_name]['severity']
             
-            scores[condition_name] = min(1.0, score)
+            score = min(1.0, score)
+            scores[condition_name] = score
+            max_score = max(max_score, score)
+            strong_count += score > 0.3
         
-        return scores
+        return AnalyzeResult(scores, max_score, strong_count)
     
-    def _calculate_urgency_modifiers(self, text: str) -> Dict[str, float]:
+    def _calculate_urgency_modifiers(self, counts: List[int]) -> Dict[str, float]:
         """Calculate urgency modifiers"""
-        modifiers = {}
-        
-        # Time indicators
-        time_matches = sum(1 for indicator in self.urgency_modifiers['time_indicators'] if indicator in text)
-        modifiers['time_urgency'] = min(1.0, time_matches * 0.3)
-        
-        # Intensity indicators
-        intensity_matches = sum(1 for indicator in self.urgency_modifiers['intensity_indicators'] if indicator in text)
-        modifiers['intensity_urgency'] = min(1.0, intensity_matches * 0.3)
-        
-        # Action indicators
-        action_matches = sum(1 for indicator in self.urgency_modifiers['action_indicators'] if indicator in text)
-        modifiers['action_urgency'] = min(1.0, action_matches * 0.4)
+        time_matches, intensity_matches, action_matches, combo_matches = counts[self._urgency_slot_offset:]
         
-        # Symptom combinations
-        combo_matches = sum(1 for combo in self.urgency_modifiers['symptom_combinations'] if combo in text)
-        modifiers['combo_urgency'] = min(1.0, combo_matches * 0.5)
-        
-        return modifiers
+        return {
+            'time_urgency': min(1.0, time_matches * 0.3),
+            'intensity_urgency': min(1.0, intensity_matches * 0.3),
+            'action_urgency': min(1.0, action_matches * 0.4),
+            'combo_urgency': min(1.0, combo_matches * 0.5)
+        }
     
-    def _combine_emergency_scores(self, critical_scores: Dict[str, float], 
-                                 priority_scores: Dict[str, float],
-                                 urgency_modifiers: Dict[str, float]) -> float:
+    def _combine_emergency_scores(self, max_critical: float, max_priority: float,
+                                 urgency_avg: float) -> float:
         """Combine all emergency scores"""
-        # Get maximum critical score
-        max_critical = max(critical_scores.values()) if critical_scores else 0.0
-        
-        # Get maximum priority score
-        max_priority = max(priority_scores.values()) if priority_scores else 0.0
-        
-        # Calculate urgency modifier
-        urgency_modifier = sum(urgency_modifiers.values()) / len(urgency_modifiers) if urgency_modifiers else 0.0
-        
         # Combine with weights
         emergency_score = (
             0.5 * max_critical +
             0.3 * max_priority +
-            0.2 * urgency_modifier
+            0.2 * urgency_avg
         )
         
         return min(1.0, max(0.0, emergency_score))
@@ -272,90 +400,62 @@ class EmergencyDetector:
         else:
             return EmergencyLevel.NONE
     
-    def _calculate_emergency_confidence(self, critical_scores: Dict[str, float],
-                                      priority_scores: Dict[str, float],
-                                      urgency_modifiers: Dict[str, float]) -> float:
+    def _calculate_emergency_confidence(self, critical: AnalyzeResult, priority: AnalyzeResult,
+                                      urgency_sum: float) -> float:
         """Calculate confidence in emergency detection"""
-        # Check if any pattern has high confidence
-        max_critical = max(critical_scores.values()) if critical_scores else 0.0
-        max_priority = max(priority_scores.values()) if priority_scores else 0.0
-        
         # Check for multiple indicators
-        indicator_count = sum(1 for score in critical_scores.values() if score > 0.3)
-        indicator_count += sum(1 for score in priority_scores.values() if score > 0.3)
+        indicator_count = critical.strong_count + priority.strong_count
         
-        # Calculate confidence
-        confidence = max(max_critical, max_priority)
+        # Calculate confidence from the strongest pattern
+        confidence = max(critical.max_score, priority.max_score)
         
         # Boost confidence for multiple indicators
         if indicator_count > 1:
             confidence += 0.2
         
         # Boost confidence for urgency modifiers
-        urgency_boost = sum(urgency_modifiers.values()) * 0.1
+        urgency_boost = urgency_sum * 0.1
         confidence += urgency_boost
         
         return min(1.0, max(0.0, confidence))
     
-    def _extract_emergency_indicators(self, text: str, critical_scores: Dict[str, float],
+    def _extract_emergency_indicators(self, hits: Set[int], critical_scores: Dict[str, float],
                                     priority_scores: Dict[str, float]) -> List[str]:
         """Extract specific emergency indicators"""
         indicators = []
+        terms = self._terms
         
         # Extract critical pattern indicators
         for pattern_name, score in critical_scores.items():
             if score > 0.3:
-                pattern_data = self.critical_patterns[pattern_name]
+                pattern_ids = self._critical_term_ids[pattern_name]
                 
                 # Find matching keywords
-                for keyword in pattern_data['keywords']:
-                    if keyword in text:
-                        indicators.append(f"Critical: {keyword}")
+                for keyword in pattern_ids['keywords']:
+                    if keyword in hits:
+                        indicators.append(f"Critical: {terms[keyword]}")
                 
                 # Find matching phrases
-                for phrase in pattern_data['phrases']:
-                    if phrase in text:
-                        indicators.append(f"Critical phrase: {phrase}")
+                for phrase in pattern_ids['phrases']:
+                    if phrase in hits:
+                        indicators.append(f"Critical phrase: {terms[phrase]}")
         
         # Extract priority condition indicators
         for condition_name, score in priority_scores.items():
             if score > 0.3:
-                condition_data = self.high_priority_conditions[condition_name]
+                condition_ids = self._priority_term_ids[condition_name]
                 
                 # Find matching keywords
-                for keyword in condition_data['keywords']:
-                    if keyword in text:
-                        indicators.append(f"Priority: {keyword}")
+                for keyword in condition_ids['keywords']:
+                    if keyword in hits:
+                        indicators.append(f"Priority: {terms[keyword]}")
         
         return indicators[:10]  # Limit to top 10 indicators
     
     def _generate_emergency_actions(self, level: EmergencyLevel, indicators: List[str], 
                                   context: str) -> List[str]:
         """Generate recommended emergency actions"""
-        actions = []
-        
-        if level == EmergencyLevel.CRITICAL:
-            actions.append("Call 911 immediately")
-            actions.append("Do not delay seeking emergency medical care")
-            actions.append("If unconscious, check for breathing and pulse")
-            actions.append("Stay with the person until help arrives")
-        
-        elif level == EmergencyLevel.HIGH:
-            actions.append("Seek immediate medical attention")
-            actions.append("Go to the nearest emergency room")
-            actions.append("Call emergency services if symptoms worsen")
-            actions.append("Do not drive yourself if experiencing severe symptoms")
-        
-        elif level == EmergencyLevel.MEDIUM:
-            actions.append("Schedule urgent medical consultation")
-            actions.append("Contact your healthcare provider immediately")
-            actions.append("Monitor symptoms closely")
-            actions.append("Go to urgent care if symptoms persist or worsen")
-        
-        elif level == EmergencyLevel.LOW:
-            actions.append("Monitor symptoms")
-            actions.append("Contact healthcare provider if symptoms worsen")
-            actions.append("Consider urgent care if symptoms persist")
+        actions = list(self._actions_by_level.get(level, ()))
         
         # Add specific actions based on indicators
         if any('chest pain' in indicator.lower() for indicator in indicators):
@@ -372,12 +472,10 @@ class EmergencyDetector:
         
         return actions
     
-    def _calculate_urgency_score(self, emergency_score: float, urgency_modifiers: Dict[str, float]) -> float:
+    def _calculate_urgency_score(self, emergency_score: float, urgency_avg: float) -> float:
         """Calculate overall urgency score"""
-        urgency_modifier = sum(urgency_modifiers.values()) / len(urgency_modifiers) if urgency_modifiers else 0.0
-        
         # Combine emergency score with urgency modifiers
-        urgency_score = 0.7 * emergency_score + 0.3 * urgency_modifier
+        urgency_score = 0.7 * emergency_score + 0.3 * urgency_avg
         
         return min(1.0, max(0.0, urgency_score))
     
@@ -399,20 +497,14 @@ class EmergencyDetector:
         if not texts:
             return {}
         
-        emergency_levels = []
-        urgency_scores = []
-        confidence_scores = []
-        
-        for text in texts:
-            detection = self.detect_emergency(text)
-            emergency_levels.append(detection.level.value)
-            urgency_scores.append(detection.urgency_score)
-            confidence_scores.append(detection.confidence)
+        level_ids, urgency_scores, confidence_scores = self._score_batch(texts)
+        members = tuple(EmergencyLevel)
+        emergency_levels = [members[level_id] for level_id in level_ids.tolist()]
         
         # Calculate trends
         level_counts = {}
         for level in emergency_levels:
-            level_counts[level] = level_counts.get(level, 0) + 1
+            level_counts[level.label] = level_counts.get(level.label, 0) + 1
         
         avg_urgency = np.mean(urgency_scores)
         avg_confidence = np.mean(confidence_scores)
@@ -426,41 +518,89 @@ class EmergencyDetector:
             'average_urgency': float(avg_urgency),
             'average_confidence': float(avg_confidence),
             'trend': trend,
-            'requires_immediate_attention': any(level in ['critical', 'high'] for level in recent_levels)
+            'requires_immediate_attention': any(level >= EmergencyLevel.HIGH for level in recent_levels)
         }
     
-    def _analyze_emergency_trend(self, levels: List[str]) -> str:
-        """Analyze emergency trend over time"""
-        if len(levels) < 2:
-            return "insufficient_data"
+    def _score_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score many texts at once without building per-text detections
         
-        # Map levels to numeric values
-        level_values = {
-            'none': 0, 'low': 1, 'medium': 2, 'high': 3, 'critical': 4
-        }
+        Mirrors the level, urgency and confidence arithmetic of detect_emergency,
+        vectorized over a text-by-term hit matrix.
+        
+        Args:
+            texts: Texts to score
+            
+        Returns:
+            Tuple of (level values, urgency scores, confidence scores) arrays
+        """
+        hit_matrix = np.zeros((len(texts), len(self._terms)))
+        for row, text in enumerate(texts):
+            hit_matrix[row, list(self._term_scanner.scan(text))] = 1.0
+        
+        slot_counts = hit_matrix @ self._slot_matrix
+        priority_offset = self._priority_slot_offset
+        urgency_offset = self._urgency_slot_offset
+        
+        # Critical patterns: per-bucket match counts, weighted in bucket order
+        counts = slot_counts[:, :priority_offset].reshape(len(texts), -1, 4)
+        critical = np.minimum(1.0, counts[..., 0] * 0.3 + counts[..., 1] * 0.4
+                              + counts[..., 2] * 0.2 + counts[..., 3] * 0.1)
+        
+        # High priority conditions
+        counts = slot_counts[:, priority_offset:urgency_offset].reshape(len(texts), -1, 3)
+        priority = np.minimum(1.0, (counts[..., 0] * 0.4 + counts[..., 1] * 0.3
+                                    + counts[..., 2] * 0.2) * self._priority_severity)
+        
+        # Urgency modifiers
+        counts = slot_counts[:, urgency_offset:]
+        urgency = np.minimum(1.0, counts * np.array([0.3, 0.3, 0.4, 0.5]))
+        urgency_sum = urgency[:, 0] + urgency[:, 1] + urgency[:, 2] + urgency[:, 3]
+        urgency_avg = urgency_sum * self._inv_n_urgency
+        
+        max_critical = critical.max(axis=1)
+        max_priority = priority.max(axis=1)
         
-        numeric_levels = [level_values.get(level, 0) for level in levels]
+        emergency_score = np.clip(0.5 * max_critical + 0.3 * max_priority + 0.2 * urgency_avg, 0.0, 1.0)
+        level_ids = ((emergency_score >= 0.3).astype(np.int64) + (emergency_score >= 0.5)
+                     + (emergency_score >= 0.7) + (emergency_score >= 0.9))
         
-        # Calculate trend
-        if len(numeric_levels) >= 2:
-            if numeric_levels[-1] > numeric_levels[0]:
-                return "escalating"
-            elif numeric_levels[-1] < numeric_levels[0]:
-                return "de-escalating"
-            else:
-                return "stable"
+        indicator_count = (critical > 0.3).sum(axis=1) + (priority > 0.3).sum(axis=1)
+        confidence = np.maximum(max_critical, max_priority) + np.where(indicator_count > 1, 0.2, 0.0)
+        confidence = np.clip(confidence + urgency_sum * 0.1, 0.0, 1.0)
         
-        return "stable"
+        urgency_score = np.clip(0.7 * emergency_score + 0.3 * urgency_avg, 0.0, 1.0)
+        
+        # Saturated critical patterns short-circuit exactly as in detect_emergency
+        saturated = max_critical >= self.CRITICAL_SHORT_CIRCUIT_SCORE
+        level_ids[saturated] = EmergencyLevel.CRITICAL
+        confidence[saturated] = 1.0
+        urgency_score[saturated] = 1.0
+        
+        return level_ids, urgency_score, confidence
+    
+    def _analyze_emergency_trend(self, levels: List[EmergencyLevel]) -> str:
+        """Analyze emergency trend over time"""
+        if len(levels) < 2:
+            return "insufficient_data"
+        
+        # Levels are ordered, so compare first and last directly
+        if levels[-1] > levels[0]:
+            return "escalating"
+        elif levels[-1] < levels[0]:
+            return "de-escalating"
+        else:
+            return "stable"
     
     def get_emergency_summary(self, detection: EmergencyDetection) -> Dict[str, Any]:
         """Get a summary of emergency detection"""
         return {
             'is_emergency': detection.is_emergency,
-            'emergency_level': detection.level.value,
+            'emergency_level': detection.level.label,
             'confidence': detection.confidence,
             'urgency_score': detection.urgency_score,
             'medical_priority': detection.medical_priority,
             'key_indicators': detection.indicators[:5],  # Top 5 indicators
             'recommended_actions': detection.recommended_actions,
-            'requires_immediate_action': detection.level in [EmergencyLevel.CRITICAL, EmergencyLevel.HIGH]
+            'requires_immediate_action': detection.level >= EmergencyLevel.HIGH
         }
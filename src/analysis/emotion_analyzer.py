@@ -1,35 +1,56 @@
 import re
+import operator
+import threading
 import numpy as np
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
 from dataclasses import dataclass
-from collections import Counter
+from collections import Counter, OrderedDict
+from functools import cached_property
+from types import MappingProxyType
 import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+from .keyword_scanner import KeywordScanner
 
-# Download required NLTK data
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
+# Set once the VADER lexicon is known to be installed, so later analyzers skip the lookup
+_VADER_READY = False
 
-@dataclass
+@dataclass(frozen=True)
 class EmotionAnalysis:
-    """Represents emotion analysis results"""
+    """Represents emotion analysis results (immutable, so cached results can be shared)"""
+    __slots__ = ('primary_emotion', 'emotion_scores', 'intensity', 'confidence',
+                 'indicators', 'recommendations')
+    
     primary_emotion: str
-    emotion_scores: Dict[str, float]
+    emotion_scores: Mapping[str, float]
     intensity: float
     confidence: float
-    indicators: List[str]
-    recommendations: List[str]
+    indicators: Tuple[str, ...]
+    recommendations: Tuple[str, ...]
 
 class EmotionAnalyzer:
     """
     Advanced emotion analysis for medical chatbot interactions
     """
     
+    # Number of recent (text, context) analyses kept for repeated queries
+    ANALYSIS_CACHE_SIZE = 1024
+    
+    # Emotion classes used for trend and attention checks
+    _POSITIVE_EMOTIONS = frozenset(('relief', 'hope'))
+    _NEGATIVE_EMOTIONS = frozenset(('anxiety', 'frustration', 'sadness', 'pain'))
+    _ATTENTION_EMOTIONS = frozenset(('anxiety', 'sadness', 'urgency', 'pain'))
+    
+    # Level labels per 0.2-wide bucket of a [0, 1] score
+    _INTENSITY_LABELS = ('very_low', 'low', 'medium', 'high', 'very_high')
+    _CONFIDENCE_LABELS = ('low', 'low', 'low', 'medium', 'high')
+    
+    # Curly quotes (common from mobile keyboards) folded to straight ones so phrases like "can't" match
+    _NORMALIZE_TABLE = str.maketrans({'\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"'})
+    
     def __init__(self):
         """Initialize emotion analyzer"""
-        self.sia = SentimentIntensityAnalyzer()
+        # LRU cache of analyze_emotion results keyed by (text, context)
+        self._analysis_cache: "OrderedDict[Tuple[str, str], EmotionAnalysis]" = OrderedDict()
+        self._analysis_cache_lock = threading.Lock()
         
         # Medical-specific emotion indicators
         self.emotion_indicators = {
@@ -86,6 +107,116 @@ class EmotionAnalyzer:
             'chronic': 1.2,
             'acute': 1.3
         }
+        
+        # Recommendation tiers per emotion: the first tier whose threshold the
+        # intensity exceeds applies
+        always = float('-inf')
+        self._recommendation_rules = {
+            'anxiety': (
+                (0.7, ("Consider suggesting relaxation techniques or breathing exercises",
+                       "Recommend speaking with a mental health professional")),
+                (always, ("Provide reassurance and clear information",
+                          "Suggest discussing concerns with a healthcare provider"))
+            ),
+            'frustration': (
+                (0.6, ("Acknowledge the frustration and validate feelings",
+                       "Provide clear, step-by-step guidance",
+                       "Suggest taking a break and returning when calmer")),
+                (always, ("Acknowledge the frustration and validate feelings",
+                          "Provide clear, step-by-step guidance"))
+            ),
+            'sadness': (
+                (0.7, ("Strongly recommend mental health support",
+                       "Provide crisis resources if needed")),
+                (always, ("Offer emotional support and understanding",
+                          "Suggest discussing feelings with a healthcare provider"))
+            ),
+            'confusion': (
+                (always, ("Provide clear, simple explanations",
+                          "Break down complex information into smaller parts",
+                          "Encourage asking follow-up questions")),
+            ),
+            'urgency': (
+                (0.6, ("Prioritize immediate medical attention",
+                       "Provide emergency contact information")),
+                (always, ("Schedule prompt medical consultation",))
+            ),
+            'pain': (
+                (0.7, ("Recommend immediate medical evaluation",
+                       "Suggest pain management strategies")),
+                (always, ("Provide pain assessment guidance",
+                          "Suggest discussing pain with healthcare provider"))
+            ),
+            'hope': (
+                (always, ("Encourage maintaining positive outlook",
+                          "Provide supportive information")),
+            )
+        }
+        self._escalation_recommendation = "Consider escalating to human healthcare provider"
+        
+        # VADER component and weight blended into each emotion
+        self._emotions = tuple(self.emotion_indicators)
+        vader_mapping = {
+            'anxiety': ('neg', 0.7),
+            'frustration': ('neg', 0.8),
+            'sadness': ('neg', 0.9),
+            'confusion': ('neu', 0.5),
+            'relief': ('pos', 0.8),
+            'urgency': ('compound', 0.6),
+            'pain': ('neg', 0.6),
+            'hope': ('pos', 0.9)
+        }
+        self._vader_lookup = operator.itemgetter(*(vader_mapping[emotion][0] for emotion in self._emotions))
+        self._vader_weights = np.array([vader_mapping[emotion][1] for emotion in self._emotions])
+        
+        # General intensity words
+        self.intensity_words = ['very', 'extremely', 'really', 'so', 'quite', 'incredibly', 'absolutely']
+        
+        # One scanner over every indicator and intensity word; each term fans out to
+        # the (emotion, bucket) slots it counts towards, at slot 3 * emotion + bucket
+        term_slots = {}
+        for emotion_idx, indicators in enumerate(self.emotion_indicators.values()):
+            for bucket_idx, bucket in enumerate(('keywords', 'phrases', 'intensity_modifiers')):
+                for term in indicators[bucket]:
+                    term_slots.setdefault(term, []).append(3 * emotion_idx + bucket_idx)
+        for word in self.intensity_words:
+            term_slots.setdefault(word, [])
+        terms = tuple(term_slots)
+        self._indicator_scanner = KeywordScanner(terms)
+        self._intensity_word_ids = tuple(terms.index(word) for word in self.intensity_words)
+        
+        # Per-emotion (term id, preformatted indicator label) pairs, in indicator order,
+        # for reading matches back out of a scan
+        label_formats = {'keywords': "Keyword: '{}'", 'phrases': "Phrase: '{}'", 'intensity_modifiers': "Intensity: '{}'"}
+        self._indicator_labels = {
+            emotion: tuple(
+                (terms.index(term), label_formats[bucket].format(term))
+                for bucket, terms_in_bucket in indicators.items()
+                for term in terms_in_bucket
+            )
+            for emotion, indicators in self.emotion_indicators.items()
+        }
+        self._keyword_ids = frozenset(
+            terms.index(term) for indicators in self.emotion_indicators.values() for term in indicators['keywords']
+        )
+        self._indicator_slots = tuple(tuple(slots) for slots in term_slots.values())
+        self._bucket_weights = np.array([0.3, 0.5, 0.2])
+    
+    @cached_property
+    def sia(self):
+        """VADER sentiment analyzer, built on first use so the lexicon only loads when needed"""
+        global _VADER_READY
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        
+        # Download required NLTK data
+        if not _VADER_READY:
+            try:
+                nltk.data.find('sentiment/vader_lexicon.zip')
+            except LookupError:
+                nltk.download('vader_lexicon')
+            _VADER_READY = True
+        
+        return SentimentIntensityAnalyzer()
     
     def analyze_emotion(self, text: str, context: str = "") -> EmotionAnalysis:
         """
@@ -98,237 +229,235 @@ class EmotionAnalyzer:
         Returns:
             EmotionAnalysis object
         """
-        text_lower = text.lower()
+        key = (text, context)
+        with self._analysis_cache_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return cached
+        
+        analysis = self._analyze_emotion(text, context)
+        
+        with self._analysis_cache_lock:
+            self._analysis_cache[key] = analysis
+            if len(self._analysis_cache) > self.ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+        
+        return analysis
+    
+    def _analyze_emotion(self, text: str, context: str) -> EmotionAnalysis:
+        """Run the full emotion analysis pipeline without caching"""
+        primary_emotion, combined_scores, intensity, confidence, hits = self._score_text(text, context)
+        
+        # Extract indicators
+        indicators = self._extract_indicators(hits, primary_emotion)
+        
+        # Generate recommendations
+        recommendations = self._generate_recommendations(primary_emotion, intensity)
+        
+        return EmotionAnalysis(
+            primary_emotion=primary_emotion,
+            emotion_scores=MappingProxyType(combined_scores),
+            intensity=intensity,
+            confidence=confidence,
+            indicators=tuple(indicators),
+            recommendations=tuple(recommendations)
+        )
+    
+    def _combined_scores(self, text: str, context: str) -> Tuple[np.ndarray, Set[int], int]:
+        """Combined emotion/sentiment scores for one text (in emotion order), with its indicator hits and word count"""
+        text_lower = text.translate(self._NORMALIZE_TABLE).lower()
+        
+        # Find all indicators in one pass and count words once for every helper
+        hits = self._indicator_scanner.scan(text_lower)
+        word_count = len(text_lower.split())
         
         # Calculate emotion scores
-        emotion_scores = self._calculate_emotion_scores(text_lower)
+        emotion_scores = self._calculate_emotion_scores(hits, word_count)
         
         # Apply medical context modifiers
         if context:
             emotion_scores = self._apply_context_modifiers(emotion_scores, context)
         
-        # Calculate VADER sentiment
-        vader_scores = self.sia.polarity_scores(text)
+        # Calculate VADER sentiment; caps emphasis is scored separately through caps_ratio
+        vader_scores = self.sia.polarity_scores(text_lower)
         
         # Combine emotion and sentiment scores
-        combined_scores = self._combine_scores(emotion_scores, vader_scores)
+        return self._combine_scores(emotion_scores, vader_scores), hits, word_count
+    
+    def _score_text(self, text: str, context: str) -> Tuple[str, Dict[str, float], float, float, Set[int]]:
+        """Score one text: primary emotion, combined scores, intensity, confidence and indicator hits"""
+        combined, hits, word_count = self._combined_scores(text, context)
         
-        # Determine primary emotion
-        primary_emotion = max(combined_scores, key=combined_scores.get)
+        # Determine primary emotion; argmax keeps the first emotion on ties
+        primary_emotion = self._emotions[int(combined.argmax())]
         
         # Calculate intensity
-        intensity = self._calculate_intensity(combined_scores, text_lower)
+        intensity = self._calculate_intensity(combined, text, hits)
         
         # Calculate confidence
-        confidence = self._calculate_confidence(combined_scores, text_lower)
-        
-        # Extract indicators
-        indicators = self._extract_indicators(text_lower, primary_emotion)
+        confidence = self._calculate_confidence(combined, word_count, hits)
         
-        # Generate recommendations
-        recommendations = self._generate_recommendations(primary_emotion, intensity, context)
-        
-        return EmotionAnalysis(
-            primary_emotion=primary_emotion,
-            emotion_scores=combined_scores,
-            intensity=intensity,
-            confidence=confidence,
-            indicators=indicators,
-            recommendations=recommendations
-        )
+        combined_scores = dict(zip(self._emotions, combined.tolist()))
+        return primary_emotion, combined_scores, intensity, confidence, hits
     
-    def _calculate_emotion_scores(self, text: str) -> Dict[str, float]:
-        """Calculate emotion scores based on keywords and phrases"""
-        scores = {emotion: 0.0 for emotion in self.emotion_indicators.keys()}
+    def _analyze_many(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a batch of texts without building per-text analyses
         
-        for emotion, indicators in self.emotion_indicators.items():
-            # Check keywords
-            keyword_matches = sum(1 for keyword in indicators['keywords'] if keyword in text)
-            
-            # Check phrases
-            phrase_matches = sum(1 for phrase in indicators['phrases'] if phrase in text)
-            
-            # Check intensity modifiers
-            intensity_matches = sum(1 for modifier in indicators['intensity_modifiers'] if modifier in text)
-            
-            # Calculate base score
-            base_score = (keyword_matches * 0.3 + phrase_matches * 0.5 + intensity_matches * 0.2)
-            
-            # Normalize by text length
-            word_count = len(text.split())
-            if word_count > 0:
-                scores[emotion] = min(1.0, base_score / (word_count / 10))
+        String work runs per text; intensity and confidence are then computed
+        for the whole batch at once from the collected numeric features.
         
-        return scores
+        Args:
+            texts: Texts to score
+            
+        Returns:
+            Tuple of (primary emotion indices, intensities, confidences) arrays
+        """
+        n_texts = len(texts)
+        combined = np.empty((n_texts, len(self._emotions)))
+        intensity_counts = np.empty(n_texts)
+        exclamation_counts = np.empty(n_texts)
+        caps_ratios = np.empty(n_texts)
+        word_counts = np.empty(n_texts)
+        has_indicator = np.empty(n_texts, dtype=bool)
+        keyword_ids = self._keyword_ids
+        
+        for i, text in enumerate(texts):
+            combined[i], hits, word_counts[i] = self._combined_scores(text, "")
+            intensity_counts[i], exclamation_counts[i], caps_ratios[i] = self._intensity_features(text, hits)
+            has_indicator[i] = not hits.isdisjoint(keyword_ids)
+        
+        # Primary emotion and the lead over the runner-up, for every text at once
+        primary_idx = combined.argmax(axis=1)
+        top_two = np.partition(combined, -2, axis=1)[:, -2:]
+        max_scores = top_two[:, 1]
+        score_diffs = top_two[:, 1] - top_two[:, 0]
+        
+        intensities = self._intensity_math(max_scores, intensity_counts, exclamation_counts, caps_ratios)
+        confidences = self._confidence_math(score_diffs, word_counts, has_indicator)
+        
+        return primary_idx, intensities, confidences
+    
+    def _calculate_emotion_scores(self, hits: Set[int], word_count: int) -> np.ndarray:
+        """Calculate emotion scores (in emotion order) based on keywords and phrases"""
+        # Scores are normalized by text length, so empty text scores zero
+        if word_count == 0:
+            return np.zeros(len(self._emotions))
+        
+        # Count keyword, phrase and intensity modifier matches per emotion in one pass,
+        # as an (emotion, bucket) matrix
+        indicator_slots = self._indicator_slots
+        slots = [slot for term_id in hits for slot in indicator_slots[term_id]]
+        counts = np.bincount(slots, minlength=3 * len(self._emotions)).reshape(-1, 3)
+        
+        # Calculate base scores, summing the weighted buckets in keyword, phrase, modifier order
+        weighted = counts * self._bucket_weights
+        base_scores = weighted[:, 0] + weighted[:, 1] + weighted[:, 2]
+        
+        # Normalize by text length
+        return np.minimum(1.0, base_scores / (word_count / 10))
     
-    def _apply_context_modifiers(self, emotion_scores: Dict[str, float], context: str) -> Dict[str, float]:
+    def _apply_context_modifiers(self, emotion_scores: np.ndarray, context: str) -> np.ndarray:
         """Apply medical context modifiers to emotion scores"""
         context_lower = context.lower()
         
-        for emotion in emotion_scores:
-            modifier = 1.0
-            
-            for medical_term, multiplier in self.medical_context_modifiers.items():
-                if medical_term in context_lower:
-                    modifier *= multiplier
-            
-            emotion_scores[emotion] = min(1.0, emotion_scores[emotion] * modifier)
+        # The modifier depends only on the context, so compute it once
+        modifier = 1.0
+        for medical_term, multiplier in self.medical_context_modifiers.items():
+            if medical_term in context_lower:
+                modifier *= multiplier
         
-        return emotion_scores
+        return np.minimum(1.0, emotion_scores * modifier)
     
-    def _combine_scores(self, emotion_scores: Dict[str, float], vader_scores: Dict[str, float]) -> Dict[str, float]:
+    def _combine_scores(self, emotion_scores: np.ndarray, vader_scores: Dict[str, float]) -> np.ndarray:
         """Combine emotion scores with VADER sentiment scores"""
-        combined = emotion_scores.copy()
-        
-        # Map VADER scores to emotions
-        vader_mapping = {
-            'anxiety': vader_scores['neg'] * 0.7,
-            'frustration': vader_scores['neg'] * 0.8,
-            'sadness': vader_scores['neg'] * 0.9,
-            'confusion': vader_scores['neu'] * 0.5,
-            'relief': vader_scores['pos'] * 0.8,
-            'urgency': vader_scores['compound'] * 0.6,
-            'pain': vader_scores['neg'] * 0.6,
-            'hope': vader_scores['pos'] * 0.9
-        }
+        # VADER score feeding each emotion, fetched in emotion order
+        vader_arr = np.array(self._vader_lookup(vader_scores))
         
         # Combine with weights
-        for emotion in combined:
-            emotion_weight = 0.7
-            vader_weight = 0.3
-            
-            combined[emotion] = (
-                emotion_weight * combined[emotion] + 
-                vader_weight * vader_mapping.get(emotion, 0)
-            )
+        emotion_weight = 0.7
+        vader_weight = 0.3
+        combined = (
+            emotion_weight * emotion_scores +
+            vader_weight * (vader_arr * self._vader_weights)
+        )
         
         return combined
     
-    def _calculate_intensity(self, emotion_scores: Dict[str, float], text: str) -> float:
-        """Calculate emotion intensity"""
-        # Base intensity from highest emotion score
-        max_score = max(emotion_scores.values())
-        
+    def _intensity_features(self, text: str, hits: Set[int]) -> Tuple[int, int, float]:
+        """Count intensity words, exclamation marks and caps ratio for one text"""
         # Intensity modifiers in text
-        intensity_words = ['very', 'extremely', 'really', 'so', 'quite', 'incredibly', 'absolutely']
-        intensity_count = sum(1 for word in intensity_words if word in text)
-        
-        # Exclamation marks
-        exclamation_count = text.count('!')
+        intensity_count = len(hits.intersection(self._intensity_word_ids))
         
-        # Caps lock usage
-        caps_ratio = sum(1 for c in text if c.isupper()) / len(text) if text else 0
+        # Exclamation marks and caps lock usage, counted over the raw bytes
+        codes = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+        exclamation_count = int(np.count_nonzero(codes == 0x21))
+        caps_count = int(np.count_nonzero((codes >= 0x41) & (codes <= 0x5A)))
+        caps_ratio = caps_count / len(text) if text else 0
         
-        # Calculate intensity
+        return intensity_count, exclamation_count, caps_ratio
+    
+    @staticmethod
+    def _intensity_math(max_score, intensity_count, exclamation_count, caps_ratio):
+        """Clamp combined intensity features to [0, 1]; works on scalars or whole arrays"""
         intensity = max_score + (intensity_count * 0.1) + (exclamation_count * 0.05) + (caps_ratio * 0.2)
-        
-        return min(1.0, max(0.0, intensity))
+        return np.clip(intensity, 0.0, 1.0)
     
-    def _calculate_confidence(self, emotion_scores: Dict[str, float], text: str) -> float:
-        """Calculate confidence in emotion detection"""
-        # Check if any emotion has a clear lead
-        sorted_scores = sorted(emotion_scores.values(), reverse=True)
-        
-        if len(sorted_scores) < 2:
-            return 0.5
-        
-        # Calculate score difference
-        score_diff = sorted_scores[0] - sorted_scores[1]
-        
+    @staticmethod
+    def _confidence_math(score_diff, word_count, has_emotional_indicator):
+        """Confidence from the lead of the top emotion; works on scalars or whole arrays"""
         # Base confidence on score difference
-        confidence = min(1.0, score_diff * 2)
+        confidence = np.minimum(1.0, score_diff * 2)
         
         # Adjust based on text length and clarity
-        word_count = len(text.split())
-        if word_count > 5:
-            confidence += 0.1
+        confidence = confidence + np.where(word_count > 5, 0.1, 0.0)
         
-        # Check for clear emotional indicators
-        emotional_indicators = sum(1 for emotion, indicators in self.emotion_indicators.items()
-                                for keyword in indicators['keywords'] if keyword in text)
+        # Boost for clear emotional indicators
+        confidence = confidence + np.where(has_emotional_indicator, 0.2, 0.0)
         
-        if emotional_indicators > 0:
-            confidence += 0.2
+        return np.clip(confidence, 0.0, 1.0)
+    
+    def _calculate_intensity(self, combined: np.ndarray, text: str, hits: Set[int]) -> float:
+        """Calculate emotion intensity"""
+        # Base intensity from highest emotion score
+        max_score = combined.max()
+        
+        intensity_count, exclamation_count, caps_ratio = self._intensity_features(text, hits)
         
-        return min(1.0, max(0.0, confidence))
+        return float(self._intensity_math(max_score, intensity_count, exclamation_count, caps_ratio))
     
-    def _extract_indicators(self, text: str, primary_emotion: str) -> List[str]:
-        """Extract specific emotion indicators from text"""
-        indicators = []
+    def _calculate_confidence(self, combined: np.ndarray, word_count: int, hits: Set[int]) -> float:
+        """Calculate confidence in emotion detection"""
+        if combined.size < 2:
+            return 0.5
         
-        if primary_emotion in self.emotion_indicators:
-            emotion_data = self.emotion_indicators[primary_emotion]
-            
-            # Find matching keywords
-            for keyword in emotion_data['keywords']:
-                if keyword in text:
-                    indicators.append(f"Keyword: '{keyword}'")
-            
-            # Find matching phrases
-            for phrase in emotion_data['phrases']:
-                if phrase in text:
-                    indicators.append(f"Phrase: '{phrase}'")
-            
-            # Find intensity modifiers
-            for modifier in emotion_data['intensity_modifiers']:
-                if modifier in text:
-                    indicators.append(f"Intensity: '{modifier}'")
+        # Check if any emotion has a clear lead over the runner-up
+        top_two = np.partition(combined, -2)[-2:]
+        score_diff = top_two[1] - top_two[0]
         
-        return indicators
+        # Check for clear emotional indicators
+        has_emotional_indicator = not hits.isdisjoint(self._keyword_ids)
+        
+        return float(self._confidence_math(score_diff, word_count, has_emotional_indicator))
     
-    def _generate_recommendations(self, primary_emotion: str, intensity: float, context: str) -> List[str]:
+    def _extract_indicators(self, hits: Set[int], primary_emotion: str) -> List[str]:
+        """Extract specific emotion indicators from text"""
+        # Matching keywords, phrases and intensity modifiers, in that order
+        return [label for term_id, label in self._indicator_labels.get(primary_emotion, ()) if term_id in hits]
+    
+    def _generate_recommendations(self, primary_emotion: str, intensity: float) -> List[str]:
         """Generate recommendations based on emotion analysis"""
         recommendations = []
         
-        if primary_emotion == 'anxiety':
-            if intensity > 0.7:
-                recommendations.append("Consider suggesting relaxation techniques or breathing exercises")
-                recommendations.append("Recommend speaking with a mental health professional")
-            else:
-                recommendations.append("Provide reassurance and clear information")
-                recommendations.append("Suggest discussing concerns with a healthcare provider")
-        
-        elif primary_emotion == 'frustration':
-            recommendations.append("Acknowledge the frustration and validate feelings")
-            recommendations.append("Provide clear, step-by-step guidance")
-            if intensity > 0.6:
-                recommendations.append("Suggest taking a break and returning when calmer")
-        
-        elif primary_emotion == 'sadness':
-            if intensity > 0.7:
-                recommendations.append("Strongly recommend mental health support")
-                recommendations.append("Provide crisis resources if needed")
-            else:
-                recommendations.append("Offer emotional support and understanding")
-                recommendations.append("Suggest discussing feelings with a healthcare provider")
-        
-        elif primary_emotion == 'confusion':
-            recommendations.append("Provide clear, simple explanations")
-            recommendations.append("Break down complex information into smaller parts")
-            recommendations.append("Encourage asking follow-up questions")
-        
-        elif primary_emotion == 'urgency':
-            if intensity > 0.6:
-                recommendations.append("Prioritize immediate medical attention")
-                recommendations.append("Provide emergency contact information")
-            else:
-                recommendations.append("Schedule prompt medical consultation")
-        
-        elif primary_emotion == 'pain':
-            if intensity > 0.7:
-                recommendations.append("Recommend immediate medical evaluation")
-                recommendations.append("Suggest pain management strategies")
-            else:
-                recommendations.append("Provide pain assessment guidance")
-                recommendations.append("Suggest discussing pain with healthcare provider")
-        
-        elif primary_emotion == 'hope':
-            recommendations.append("Encourage maintaining positive outlook")
-            recommendations.append("Provide supportive information")
+        for threshold, tier in self._recommendation_rules.get(primary_emotion, ()):
+            if intensity > threshold:
+                recommendations.extend(tier)
+                break
         
         # General recommendations
         if intensity > 0.8:
-            recommendations.append("Consider escalating to human healthcare provider")
+            recommendations.append(self._escalation_recommendation)
         
         return recommendations
     
@@ -337,20 +466,13 @@ class EmotionAnalyzer:
         if not texts:
             return {}
         
-        emotions = []
-        intensities = []
-        confidences = []
-        
-        for text in texts:
-            analysis = self.analyze_emotion(text)
-            emotions.append(analysis.primary_emotion)
-            intensities.append(analysis.intensity)
-            confidences.append(analysis.confidence)
+        primary_idx, intensities, confidences = self._analyze_many(texts)
+        emotions = [self._emotions[idx] for idx in primary_idx.tolist()]
         
         # Calculate trends
         emotion_counts = Counter(emotions)
-        avg_intensity = np.mean(intensities)
-        avg_confidence = np.mean(confidences)
+        avg_intensity = intensities.mean()
+        avg_confidence = confidences.mean()
         
         # Identify dominant emotion
         dominant_emotion = emotion_counts.most_common(1)[0][0] if emotion_counts else 'neutral'
@@ -364,7 +486,7 @@ class EmotionAnalyzer:
             'average_intensity': float(avg_intensity),
             'average_confidence': float(avg_confidence),
             'emotion_stability': float(emotion_stability),
-            'trend_analysis': self._analyze_emotion_trend(emotions, intensities)
+            'trend_analysis': self._analyze_emotion_trend(emotions, intensities[-3:].tolist())
         }
     
     def _analyze_emotion_trend(self, emotions: List[str], intensities: List[float]) -> str:
@@ -373,16 +495,14 @@ class EmotionAnalyzer:
             return "insufficient_data"
         
         # Simple trend analysis
-        positive_emotions = ['relief', 'hope']
-        negative_emotions = ['anxiety', 'frustration', 'sadness', 'pain']
-        
         recent_emotions = emotions[-3:]  # Last 3 emotions
         recent_intensities = intensities[-3:]
         
-        positive_count = sum(1 for emotion in recent_emotions if emotion in positive_emotions)
-        negative_count = sum(1 for emotion in recent_emotions if emotion in negative_emotions)
+        positive_count = sum(1 for emotion in recent_emotions if emotion in self._POSITIVE_EMOTIONS)
+        negative_count = sum(1 for emotion in recent_emotions if emotion in self._NEGATIVE_EMOTIONS)
         
-        avg_recent_intensity = np.mean(recent_intensities)
+        # Plain Python mean: NumPy dispatch costs more than averaging three floats
+        avg_recent_intensity = sum(recent_intensities) / len(recent_intensities)
         
         if positive_count > negative_count and avg_recent_intensity < 0.6:
             return "improving"
@@ -400,28 +520,14 @@ class EmotionAnalyzer:
             'key_indicators': analysis.indicators[:3],  # Top 3 indicators
             'recommendations': analysis.recommendations,
             'emotion_scores': {k: round(v, 3) for k, v in analysis.emotion_scores.items()},
-            'requires_attention': analysis.intensity > 0.7 or analysis.primary_emotion in ['anxiety', 'sadness', 'urgency', 'pain']
+            'requires_attention': analysis.intensity > 0.7 or analysis.primary_emotion in self._ATTENTION_EMOTIONS
         }
     
     def _get_intensity_level(self, intensity: float) -> str:
         """Get intensity level description"""
-        if intensity >= 0.8:
-            return 'very_high'
-        elif intensity >= 0.6:
-            return 'high'
-        elif intensity >= 0.4:
-            return 'medium'
-        elif intensity >= 0.2:
-            return 'low'
-        else:
-            return 'very_low'
+        return self._INTENSITY_LABELS[max(0, min(4, int(intensity * 5)))]
     
     def _get_confidence_level(self, confidence: float) -> str:
         """Get confidence level description"""
-        if confidence >= 0.8:
-            return 'high'
-        elif confidence >= 0.6:
-            return 'medium'
-        else:
-            return 'low'
+        return self._CONFIDENCE_LABELS[max(0, min(4, int(confidence * 5)))]
 
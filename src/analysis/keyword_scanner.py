@@ -0,0 +1,82 @@
+import re
+from typing import Sequence, Set, Tuple
+
+
+def _trie_pattern(terms) -> str:
+    """Build a regex alternation for terms with shared prefixes factored into a trie"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Wrap before making optional so the quantifier covers the whole suffix
+            return body + '?' if len(branches) > 1 else '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+class KeywordScanner:
+    """
+    Single-pass keyword scanner with ``keyword in text`` semantics
+
+    All keywords are compiled into one trie-shaped lookahead regex, so a text
+    is walked once regardless of how many keywords are tracked.
+    """
+
+    def __init__(self, terms: Sequence[str], ignore_case: bool = False):
+        """
+        Initialize keyword scanner
+
+        Args:
+            terms: Keywords to look for (lowercase when ignore_case is set)
+            ignore_case: Match ASCII letters case-insensitively without lowercasing the text
+        """
+        self.terms: Tuple[str, ...] = tuple(terms)
+        self._ignore_case = ignore_case
+
+        unique_terms = set(self.terms)
+        self._pattern = None
+        if unique_terms:
+            # Greedy optional suffixes make the lookahead report the longest term at each offset
+            self._pattern = re.compile(
+                '(?=(' + _trie_pattern(unique_terms) + '))',
+                re.IGNORECASE | re.ASCII if ignore_case else 0
+            )
+
+        # A hit on a term implies a hit on every term it contains
+        self._implied_terms = {
+            term: frozenset(idx for idx, other in enumerate(self.terms) if other in term)
+            for term in unique_terms
+        }
+
+    def scan(self, text: str) -> Set[int]:
+        """
+        Find the keywords present in text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Indices into terms of every keyword occurring in text
+        """
+        hits = set()
+        if self._pattern is None:
+            return hits
+
+        implied_terms = self._implied_terms
+        if self._ignore_case:
+            for match in self._pattern.finditer(text):
+                hits.update(implied_terms[match.group(1).lower()])
+        else:
+            for match in self._pattern.finditer(text):
+                hits.update(implied_terms[match.group(1)])
+
+        return hits
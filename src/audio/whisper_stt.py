@@ -1,9 +1,12 @@
 import whisper
 import numpy as np
 import io
-import tempfile
-import os
-from typing import Dict, Any, Optional, List
+import subprocess
+import threading
+import time
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Sequence
 import torch
 from config.settings import settings
 
@@ -12,26 +15,152 @@ class WhisperSTT:
     Speech-to-Text using OpenAI Whisper
     """
     
-    def __init__(self, model_size: str = "base"):
+    # Language codes Whisper can transcribe
+    _SUPPORTED_LANGUAGES = (
+        "af", "am", "ar", "as", "az", "ba", "be", "bg", "bn", "bo", "br", "bs", "ca", "cs", "cy",
+        "da", "de", "el", "en", "es", "et", "eu", "fa", "fi", "fo", "fr", "gl", "gu", "ha", "haw",
+        "he", "hi", "hr", "ht", "hu", "hy", "id", "is", "it", "ja", "jw", "ka", "kk", "km", "kn",
+        "ko", "la", "lb", "ln", "lo", "lt", "lv", "mg", "mi", "mk", "ml", "mn", "mr", "ms", "mt",
+        "my", "ne", "nl", "nn", "no", "oc", "pa", "pl", "ps", "pt", "ro", "ru", "sa", "sd", "si",
+        "sk", "sl", "sn", "so", "sq", "sr", "su", "sv", "sw", "ta", "te", "tg", "th", "tk", "tr",
+        "tt", "uk", "ur", "uz", "vi", "yi", "yo", "zh"
+    )
+    
+    # Clips of up to 30 s encoded and decoded together in one forward pass by transcribe_batch
+    TRANSCRIBE_BATCH_SIZE = 8
+    
+    # Seconds after a failed model load before a request tries again (warmup() retries at once)
+    MODEL_RETRY_INTERVAL = 60.0
+    
+    def __init__(self, model_size: str = "base", use_fp16: Optional[bool] = None,
+                 backend: str = "openai"):
         """
         Initialize Whisper STT
         
         Args:
             model_size: Whisper model size (tiny, base, small, medium, large)
+            use_fp16: Run inference in half precision (defaults to True on CUDA, False on CPU)
+            backend: "openai" for openai-whisper, or "faster" for the CTranslate2-based
+                faster-whisper package (int8 kernels, must be installed separately)
         """
         self.model_size = model_size
+        self.backend = backend
         self.model = None
         self.device = "cuda" if settings.USE_CUDA and torch.cuda.is_available() else "cpu"
-        self._load_model()
+        # FP16 halves memory traffic on GPU; CPU inference stays in FP32 for compatibility
+        self.fp16 = (self.device == "cuda") if use_fp16 is None else use_fp16
+        # ffmpeg decoding runs here so it can overlap with inference on the previous clip
+        self._decode_pool = ThreadPoolExecutor(max_workers=2)
+        # Weights are loaded on first use (or by warmup()), so processes that never
+        # transcribe do not pay for them at startup
+        self._model_lock = threading.Lock()
+        self._load_error: Optional[str] = None
+        self._load_failed_at: Optional[float] = None
     
     def _load_model(self):
         """Load Whisper model"""
         try:
-            self.model = whisper.load_model(self.model_size, device=self.device)
-            print(f"Whisper model {self.model_size} loaded on {self.device}")
+            if self.backend == "faster":
+                from faster_whisper import WhisperModel
+                
+                compute_type = "int8_float16" if self.device == "cuda" else "int8"
+                self.model = WhisperModel(self.model_size, device=self.device, compute_type=compute_type)
+            else:
+                self.model = whisper.load_model(self.model_size, device=self.device)
+                
+                # Inference only: no dropout and no gradient tracking on the weights
+                self.model.eval()
+                for param in self.model.parameters():
+                    param.requires_grad_(False)
+            
+            print(f"Whisper model {self.model_size} ({self.backend}) loaded on {self.device}")
+            self._load_error = None
+            self._load_failed_at = None
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
             self.model = None
+            self._load_error = str(e)
+            self._load_failed_at = time.monotonic()
+    
+    def _ensure_model(self, retry: bool = False) -> bool:
+        """
+        Load the model on first use; returns whether it is available
+        
+        After a failed load, requests fail fast for MODEL_RETRY_INTERVAL
+        seconds instead of each reloading the model behind the lock.
+        
+        Args:
+            retry: Try loading again even within the retry interval
+        """
+        if self.model is None:
+            if not retry and self._in_retry_backoff():
+                return False
+            with self._model_lock:
+                if self.model is None and (retry or not self._in_retry_backoff()):
+                    self._load_model()
+        return self.model is not None
+    
+    def _in_retry_backoff(self) -> bool:
+        """Whether the last model load failed less than MODEL_RETRY_INTERVAL seconds ago"""
+        failed_at = self._load_failed_at
+        return failed_at is not None and time.monotonic() - failed_at < self.MODEL_RETRY_INTERVAL
+    
+    def warmup(self) -> bool:
+        """
+        Load the model ahead of the first request and run one dummy pass
+        
+        The dummy pass initializes the device kernels, so the first real
+        transcription does not pay for them.
+        
+        Returns:
+            True if the model is loaded and ready
+        """
+        if not self._ensure_model(retry=True):
+            return False
+        
+        try:
+            # One second of silence through the encoder and decoder
+            silence = np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32)
+            if self.backend == "faster":
+                segments, _ = self.model.transcribe(silence, language="en")
+                list(segments)
+            else:
+                self._transcribe_short_batch([silence], "en", "transcribe")
+        except Exception as e:
+            print(f"Whisper warmup error: {e}")
+        
+        return True
+    
+    def unload(self):
+        """Release the model weights; the next request loads them again"""
+        with self._model_lock:
+            self.model = None
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+    
+    def _decode_audio(self, audio_data: bytes) -> np.ndarray:
+        """
+        Decode audio bytes to a mono float32 waveform at Whisper's sample rate
+        
+        The bytes are piped through ffmpeg in memory, so no temporary file is written.
+        
+        Args:
+            audio_data: Encoded audio data as bytes
+            
+        Returns:
+            Waveform normalized to [-1, 1]
+        """
+        cmd = [
+            "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(whisper.audio.SAMPLE_RATE),
+            "pipe:1"
+        ]
+        try:
+            proc = subprocess.run(cmd, input=audio_data, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+        
+        return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
     
     def transcribe(self, audio_data: bytes, language: str = None, 
                   task: str = "transcribe") -> Dict[str, Any]:
@@ -46,7 +175,7 @@ class WhisperSTT:
         Returns:
             Dictionary with transcription results
         """
-        if not self.model:
+        if not self._ensure_model():
             return {
                 "text": "",
                 "error": "Whisper model not loaded",
@@ -54,41 +183,201 @@ class WhisperSTT:
             }
         
         try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+            return self._transcribe_decoded(self._decode_audio(audio_data), language, task)
+            
+        except Exception as e:
+            return {
+                "text": "",
+                "error": str(e),
+                "confidence": 0.0
+            }
+    
+    def transcribe_batch(self, audio_clips: List[bytes], language: str = None,
+                         task: str = "transcribe") -> List[Dict[str, Any]]:
+        """
+        Transcribe several audio clips
+        
+        The next clip is decoded on a worker thread while the current one is
+        transcribed, so ffmpeg and the model run side by side. With the openai
+        backend, clips that fit in Whisper's 30 s window are transcribed together
+        in batches of TRANSCRIBE_BATCH_SIZE as a single window each, without
+        segment timestamps.
+        
+        Args:
+            audio_clips: Audio data for each clip as bytes
+            language: Expected language (optional)
+            task: Task type (transcribe or translate)
+            
+        Returns:
+            List of transcription results, in the order of audio_clips
+        """
+        if not self._ensure_model():
+            return [{
+                "text": "",
+                "error": "Whisper model not loaded",
+                "confidence": 0.0
+            } for _ in audio_clips]
+        
+        results = [None] * len(audio_clips)
+        short_clips = []  # (index, waveform) pairs batched after every clip is decoded
+        pending = self._decode_pool.submit(self._decode_audio, audio_clips[0]) if audio_clips else None
+        
+        for i in range(len(audio_clips)):
+            decoding = pending
             
-            # Transcribe using Whisper
-            result = self.model.transcribe(
-                temp_file_path,
-                language=language,
-                task=task,
-                fp16=False,  # Use fp32 for better compatibility
-                verbose=False
-            )
+            # Prefetch: start decoding the next clip before transcribing this one
+            if i + 1 < len(audio_clips):
+                pending = self._decode_pool.submit(self._decode_audio, audio_clips[i + 1])
             
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            try:
+                audio = decoding.result()
+                if self.backend == "openai" and len(audio) <= whisper.audio.N_SAMPLES:
+                    short_clips.append((i, audio))
+                else:
+                    results[i] = self._transcribe_decoded(audio, language, task)
+            except Exception as e:
+                results[i] = {
+                    "text": "",
+                    "error": str(e),
+                    "confidence": 0.0
+                }
+        
+        for start in range(0, len(short_clips), self.TRANSCRIBE_BATCH_SIZE):
+            batch = short_clips[start:start + self.TRANSCRIBE_BATCH_SIZE]
+            try:
+                batch_results = self._transcribe_short_batch([audio for _, audio in batch], language, task)
+            except Exception as e:
+                batch_results = [{
+                    "text": "",
+                    "error": str(e),
+                    "confidence": 0.0
+                } for _ in batch]
             
-            # Calculate confidence score
-            confidence = self._calculate_confidence(result)
+            for (i, _), result in zip(batch, batch_results):
+                results[i] = result
+        
+        return results
+    
+    def _transcribe_short_batch(self, waveforms: List[np.ndarray], language: Optional[str],
+                                task: str) -> List[Dict[str, Any]]:
+        """
+        Transcribe clips of up to 30 s with one batched encoder and decoder pass
+        
+        Args:
+            waveforms: Decoded clips, each at most whisper.audio.N_SAMPLES long
+            language: Expected language (optional; detected per clip otherwise)
+            task: Task type (transcribe or translate)
             
-            return {
-                "text": result["text"].strip(),
-                "language": result.get("language", "unknown"),
+        Returns:
+            transcribe()-shaped results, one segment spanning each clip
+        """
+        with torch.inference_mode():
+            # Stack the padded mel spectrograms into one (batch, n_mels, frames) input
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(waveform).to(self.model.device)))
+                for waveform in waveforms
+            ])
+            options = whisper.DecodingOptions(task=task, language=language, fp16=self.fp16,
+                                              without_timestamps=True)
+            decoded = self.model.decode(mel, options)
+        
+        # Confidence for the whole batch at once; each clip is a single segment, so the
+        # duration-weighted mean reduces to the segment's own confidence
+        durations = np.array([len(waveform) for waveform in waveforms], dtype=np.float64) / whisper.audio.SAMPLE_RATE
+        logprobs = np.array([decoding.avg_logprob for decoding in decoded], dtype=np.float64)
+        confidences = np.where(durations > 0, np.clip(np.exp(logprobs), 0.0, 1.0), 0.0)
+        
+        results = []
+        for decoding, duration, confidence in zip(decoded, durations.tolist(), confidences.tolist()):
+            results.append({
+                "text": decoding.text.strip(),
+                "language": decoding.language,
                 "confidence": confidence,
-                "segments": result.get("segments", []),
+                "segments": [{
+                    "id": 0,
+                    "start": 0.0,
+                    "end": duration,
+                    "text": decoding.text,
+                    "avg_logprob": decoding.avg_logprob,
+                    "no_speech_prob": decoding.no_speech_prob
+                }],
                 "task": task,
                 "error": None
-            }
+            })
+        
+        return results
+    
+    def _transcribe_decoded(self, audio: np.ndarray, language: Optional[str], task: str) -> Dict[str, Any]:
+        """Transcribe an already decoded waveform and build the transcribe() result"""
+        # Transcribe using Whisper
+        if self.backend == "faster":
+            result = self._transcribe_faster(audio, language=language, task=task)
+        else:
+            with torch.inference_mode():
+                result = self.model.transcribe(
+                    audio,
+                    language=language,
+                    task=task,
+                    fp16=self.fp16,
+                    verbose=False
+                )
+        
+        # Calculate confidence score
+        confidence = self._calculate_confidence(result)
+        
+        return {
+            "text": result["text"].strip(),
+            "language": result.get("language", "unknown"),
+            "confidence": confidence,
+            "segments": result.get("segments", []),
+            "task": task,
+            "error": None
+        }
+    
+    def _transcribe_faster(self, audio: np.ndarray, language: str = None, task: str = "transcribe",
+                           word_timestamps: bool = False) -> Dict[str, Any]:
+        """
+        Transcribe with the faster-whisper backend
+        
+        Args:
+            audio: Waveform from _decode_audio
+            language: Expected language (optional)
+            task: Task type (transcribe or translate)
+            word_timestamps: Include word-level timestamps
             
-        except Exception as e:
-            return {
-                "text": "",
-                "error": str(e),
-                "confidence": 0.0
+        Returns:
+            Result shaped like openai-whisper's transcribe output
+        """
+        segments_iter, info = self.model.transcribe(
+            audio,
+            language=language,
+            task=task,
+            word_timestamps=word_timestamps,
+            vad_filter=True
+        )
+        
+        segments = []
+        for segment in segments_iter:
+            processed_segment = {
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob
             }
+            if segment.words is not None:
+                processed_segment["words"] = [
+                    {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+                    for word in segment.words
+                ]
+            segments.append(processed_segment)
+        
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": info.language,
+            "segments": segments
+        }
     
     def _calculate_confidence(self, whisper_result: Dict[str, Any]) -> float:
         """
@@ -104,24 +393,28 @@ class WhisperSTT:
         if not segments:
             return 0.0
         
-        # Calculate average confidence from segments
-        total_confidence = 0.0
-        total_duration = 0.0
+        # Duration-weighted average confidence over segments that carry a log probability
+        scored = [segment for segment in segments if "avg_logprob" in segment]
+        logprobs = np.fromiter((segment["avg_logprob"] for segment in scored), dtype=np.float64, count=len(scored))
+        durations = np.fromiter((segment.get("end", 0) - segment.get("start", 0) for segment in scored),
+                                dtype=np.float64, count=len(scored))
         
-        for segment in segments:
-            if "avg_logprob" in segment:
-                # Convert log probability to confidence
-                confidence = min(1.0, max(0.0, np.exp(segment["avg_logprob"])))
-                duration = segment.get("end", 0) - segment.get("start", 0)
-                
-                total_confidence += confidence * duration
-                total_duration += duration
+        # Convert log probabilities to confidences
+        confidences = np.clip(np.exp(logprobs), 0.0, 1.0)
         
+        total_duration = durations.sum()
         if total_duration > 0:
-            return total_confidence / total_duration
+            return float(np.dot(confidences, durations) / total_duration)
         
         return 0.0
     
+    @staticmethod
+    def _exp_scores(values: List[Optional[float]]) -> List[float]:
+        """Exponentiate scores in one call; missing (None) scores map to 0.0"""
+        present = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        scores = np.fromiter((0.0 if value is None else value for value in values), dtype=np.float64, count=len(values))
+        return np.where(present, np.exp(scores), 0.0).tolist()
+    
     def detect_language(self, audio_data: bytes) -> str:
         """
         Detect language from audio
@@ -132,28 +425,28 @@ class WhisperSTT:
         Returns:
             Detected language code
         """
-        if not self.model:
+        if not self._ensure_model():
             return "unknown"
         
         try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+            # Detect language using Whisper; move the raw samples to the model's device
+            # first so the mel spectrogram is computed there instead of copied over
+            if self.backend == "faster":
+                # faster-whisper detects the language before decoding any segment
+                _, info = self.model.transcribe(self._decode_audio(audio_data))
+                return info.language
             
-            # Detect language using Whisper
-            audio = whisper.load_audio(temp_file_path)
-            audio = whisper.pad_or_trim(audio)
+            audio = torch.from_numpy(self._decode_audio(audio_data)).to(self.model.device, non_blocking=True)
             
-            # Get language detection
-            mel = whisper.log_mel_spectrogram(audio).to(self.model.device)
-            _, probs = self.model.detect_language(mel)
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            with torch.inference_mode():
+                audio = whisper.pad_or_trim(audio)
+                
+                # Get language detection
+                mel = whisper.log_mel_spectrogram(audio)
+                _, probs = self.model.detect_language(mel)
             
             # Return most likely language
-            return max(probs, key=probs.get)
+            return max(probs.items(), key=itemgetter(1))[0]
             
         except Exception as e:
             print(f"Language detection error: {e}")
@@ -171,7 +464,7 @@ class WhisperSTT:
         Returns:
             Dictionary with transcription and timestamps
         """
-        if not self.model:
+        if not self._ensure_model():
             return {
                 "text": "",
                 "segments": [],
@@ -179,30 +472,35 @@ class WhisperSTT:
             }
         
         try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+            audio = self._decode_audio(audio_data)
             
             # Transcribe with word-level timestamps
-            result = self.model.transcribe(
-                temp_file_path,
-                language=language,
-                word_timestamps=True,
-                fp16=False
-            )
+            if self.backend == "faster":
+                result = self._transcribe_faster(audio, language=language, word_timestamps=True)
+            else:
+                with torch.inference_mode():
+                    result = self.model.transcribe(
+                        audio,
+                        language=language,
+                        word_timestamps=True,
+                        fp16=self.fp16
+                    )
+            
+            segments = result.get("segments", [])
+            words = [word for segment in segments for word in segment.get("words", [])]
             
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            # Segment and word confidences, each computed in one vectorized pass
+            segment_confidences = iter(self._exp_scores([segment.get("avg_logprob") for segment in segments]))
+            word_confidences = iter(self._exp_scores([word.get("probability") for word in words]))
             
             # Process segments with word timestamps
             processed_segments = []
-            for segment in result.get("segments", []):
+            for segment in segments:
                 processed_segment = {
                     "start": segment.get("start", 0),
                     "end": segment.get("end", 0),
                     "text": segment.get("text", "").strip(),
-                    "confidence": np.exp(segment.get("avg_logprob", 0)) if "avg_logprob" in segment else 0.0,
+                    "confidence": next(segment_confidences),
                     "words": []
                 }
                 
@@ -213,7 +511,7 @@ class WhisperSTT:
                             "word": word.get("word", ""),
                             "start": word.get("start", 0),
                             "end": word.get("end", 0),
-                            "confidence": np.exp(word.get("probability", 0)) if "probability" in word else 0.0
+                            "confidence": next(word_confidences)
                         })
                 
                 processed_segments.append(processed_segment)
@@ -246,39 +544,39 @@ class WhisperSTT:
         """
         return self.transcribe(audio_data, language=target_language, task="translate")
     
-    def get_supported_languages(self) -> List[str]:
+    def get_supported_languages(self) -> Sequence[str]:
         """
         Get list of supported languages
         
         Returns:
-            List of supported language codes
+            Sequence of supported language codes
         """
-        return [
-            "af", "am", "ar", "as", "az", "ba", "be", "bg", "bn", "bo", "br", "bs", "ca", "cs", "cy",
-            "da", "de", "el", "en", "es", "et", "eu", "fa", "fi", "fo", "fr", "gl", "gu", "ha", "haw",
-            "he", "hi", "hr", "ht", "hu", "hy", "id", "is", "it", "ja", "jw", "ka", "kk", "km", "kn",
-            "ko", "la", "lb", "ln", "lo", "lt", "lv", "mg", "mi", "mk", "ml", "mn", "mr", "ms", "mt",
-            "my", "ne", "nl", "nn", "no", "oc", "pa", "pl", "ps", "pt", "ro", "ru", "sa", "sd", "si",
-            "sk", "sl", "sn", "so", "sq", "sr", "su", "sv", "sw", "ta", "te", "tg", "th", "tk", "tr",
-            "tt", "uk", "ur", "uz", "vi", "yi", "yo", "zh"
-        ]
+        return self._SUPPORTED_LANGUAGES
     
     def get_model_info(self) -> Dict[str, Any]:
         """
-        Get information about the loaded model
+        Get information about the model
+        
+        Does not load the model; parameters are only counted once it is loaded.
         
         Returns:
             Dictionary with model information
         """
-        if not self.model:
-            return {"error": "Model not loaded"}
+        if self._load_error:
+            return {"error": f"Model not loaded: {self._load_error}"}
         
+        model = self.model
         return {
             "model_size": self.model_size,
+            "backend": self.backend,
             "device": self.device,
+            "precision": "int8" if self.backend == "faster" else ("fp16" if self.fp16 else "fp32"),
             "is_multilingual": True,
-            "supported_languages": self.get_supported_languages(),
-            "model_parameters": sum(p.numel() for p in self.model.parameters())
+            "supported_languages": self._SUPPORTED_LANGUAGES,
+            "loaded": model is not None,
+            # faster-whisper's CTranslate2 model does not expose its weights
+            "model_parameters": sum(p.numel() for p in model.parameters())
+                                if model is not None and self.backend == "openai" else None
         }
     
     def health_check(self) -> Dict[str, Any]:
@@ -289,10 +587,19 @@ class WhisperSTT:
             Health check results
         """
         try:
-            if not self.model:
+            # A model that is simply not loaded yet is fine; only a failed load is an error.
+            # The error is kept while a retry is loading, until that load succeeds
+            if self._load_error:
                 return {
                     'status': 'error',
-                    'message': 'Whisper model not loaded',
+                    'message': f'Whisper model not loaded: {self._load_error}',
+                    'ready': False
+                }
+            
+            if self.model is None and self._model_lock.locked():
+                return {
+                    'status': 'loading',
+                    'message': 'Whisper model is loading',
                     'ready': False
                 }
             
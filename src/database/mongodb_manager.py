@@ -1,17 +1,54 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, WriteConcern
+from pymongo.errors import BulkWriteError
 from pymongo.collection import Collection
 from pymongo.database import Database
-from typing import List, Dict, Any, Optional, Union
-from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+from datetime import datetime, timezone
 import json
+import logging
+import threading
+from functools import lru_cache
 from bson import ObjectId
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=4096)
+def _oid(object_id: str) -> ObjectId:
+    """Parse a hex ID string, reusing the ObjectId for recently seen conversations"""
+    return ObjectId(object_id)
+
 class MongoDBManager:
     """
     Manages MongoDB operations for medical chatbot
     """
     
+    # Buffered messages are written once this many are pending, or after this many seconds
+    MESSAGE_FLUSH_SIZE = 100
+    MESSAGE_FLUSH_INTERVAL = 1.0
+    
+    # Documents per network batch when streaming medical data and feedback
+    STREAM_BATCH_SIZE = 50
+    
+    # Documents per unordered insert_many call in the bulk creation methods
+    BULK_INSERT_BATCH_SIZE = 1000
+    
+    # Conversation IDs looked up per query by purge_orphaned_messages
+    ORPHAN_SWEEP_BATCH_SIZE = 1000
+    
+    # Fields of a message document returned to callers
+    _MESSAGE_PROJECTION = {'_id': 0, 'conversation_id': 0}
+    
+    # Fields of a conversation listed by get_user_conversations and search_conversations;
+    # leaves out any legacy embedded messages array
+    _CONVERSATION_SUMMARY_PROJECTION = {
+        'user_id': 1,
+        'session_id': 1,
+        'created_at': 1,
+        'updated_at': 1,
+        'metadata': 1
+    }
+    
     def __init__(self):
         """Initialize MongoDB manager"""
         self.uri = settings.MONGO_URI
@@ -20,6 +57,16 @@ class MongoDBManager:
         self.client = None
         self.database = None
         self.collection = None
+        self.messages = None
+        self.vector_metadata = None
+        
+        # Messages queued by add_messages_bulk, each already holding its seq, until the
+        # next flush; messages that failed to insert are queued again for the flush after
+        self._pending_messages: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        # Errors from flushes no caller saw (timer flushes), raised by the next flush_messages()
+        self._flush_errors: List[str] = []
         
         if self.uri:
             self._initialize_connection()
@@ -27,19 +74,145 @@ class MongoDBManager:
     def _initialize_connection(self):
         """Initialize MongoDB connection"""
         try:
-            self.client = MongoClient(self.uri)
+            # Chat traffic is written with w=1 and no journal wait for low latency;
+            # medical data overrides this with a majority, journaled write concern
+            self.client = MongoClient(
+                self.uri,
+                maxPoolSize=settings.MONGO_POOL_SIZE,
+                minPoolSize=10,
+                maxIdleTimeMS=30000,
+                w=1,
+                journal=False,
+                retryWrites=True,
+                compressors=settings.MONGO_COMPRESSORS
+            )
             self.database = self.client[self.database_name]
             self.collection = self.database[self.collection_name]
+            # Messages live in their own collection, one document per message keyed by
+            # (conversation_id, seq), so conversation documents stay small
+            self.messages = self.database['messages']
+            # Metadata of Pinecone vectors by ID, for PineconeManager's metadata_store
+            self.vector_metadata = self.database['vector_metadata']
             
             # Test connection
             self.client.admin.command('ping')
-            print(f"Connected to MongoDB: {self.database_name}")
+            logger.info(f"Connected to MongoDB: {self.database_name}")
             
         except Exception as e:
-            print(f"Error connecting to MongoDB: {e}")
+            logger.error(f"Error connecting to MongoDB: {e}")
             self.client = None
             self.database = None
             self.collection = None
+            self.messages = None
+            self.vector_metadata = None
+    
+    def _reserve_seq(self, conversation_id: str, count: int, now: datetime) -> Optional[int]:
+        """Bump a conversation's message counter by count and return the first reserved seq (None if not found)"""
+        conversation = self.collection.find_one_and_update(
+            {'_id': _oid(conversation_id)},
+            {
+                '$set': {
+                    'updated_at': now,
+                    'metadata.last_activity': now
+                },
+                '$inc': {'metadata.total_messages': count}
+            },
+            projection={'metadata.total_messages': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if conversation is None:
+            return None
+        
+        return conversation['metadata']['total_messages'] - count + 1
+    
+    def _migrate_conversation_messages(self, conversation_id: ObjectId, session=None) -> bool:
+        """
+        Move a conversation's legacy embedded messages into the messages collection
+        
+        The embedded messages get seq 1..N in array order, and any messages already
+        in the collection for the conversation are renumbered after them, so message
+        N has seq N again and the counter matches. The embedded array is removed only
+        by the same update that fixes the counter.
+        
+        Args:
+            conversation_id: Conversation ObjectId
+            session: Client session whose transaction makes the move atomic (optional)
+            
+        Returns:
+            True if the conversation had embedded messages
+        """
+        conversation = self.collection.find_one(
+            {'_id': conversation_id, 'messages': {'$exists': True}},
+            {'messages': 1},
+            session=session
+        )
+        if conversation is None:
+            return False
+        
+        key = str(conversation_id)
+        existing = list(self.messages.find({'conversation_id': key}, session=session).sort('seq', 1))
+        copied = {document['message_id'] for document in existing}
+        
+        documents = [{
+            'conversation_id': key,
+            'message_id': message.get('message_id') or str(ObjectId()),
+            'content': message.get('content', ''),
+            'type': message.get('type', 'user'),
+            'timestamp': message.get('timestamp'),
+            'metadata': message.get('metadata') or {}
+        } for message in conversation['messages'] or [] if message.get('message_id') not in copied]
+        documents.extend(existing)
+        
+        for seq, document in enumerate(documents, 1):
+            document['seq'] = seq
+        
+        self.messages.delete_many({'conversation_id': key}, session=session)
+        if documents:
+            self.messages.insert_many(documents, session=session)
+        
+        self.collection.update_one(
+            {'_id': conversation_id},
+            {
+                '$unset': {'messages': ''},
+                '$set': {'metadata.total_messages': len(documents)}
+            },
+            session=session
+        )
+        return True
+    
+    def _migrate_in_transaction(self, conversation_id: ObjectId) -> bool:
+        """Run _migrate_conversation_messages in a transaction where the deployment supports one"""
+        if self.client.topology_description.topology_type_name not in ('ReplicaSetWithPrimary', 'Sharded'):
+            return self._migrate_conversation_messages(conversation_id)
+        
+        with self.client.start_session() as session:
+            return session.with_transaction(
+                lambda s: self._migrate_conversation_messages(conversation_id, s)
+            )
+    
+    def migrate_legacy_messages(self) -> int:
+        """
+        Move every conversation's legacy embedded messages into the messages collection
+        
+        Each conversation is moved in its own transaction on replica sets and
+        sharded clusters. Standalone servers have no transactions, so run it there
+        before the API takes traffic. Safe to run repeatedly.
+        
+        Returns:
+            Number of conversations migrated
+        """
+        if self.collection is None:
+            raise Exception("MongoDB not initialized")
+        
+        migrated = 0
+        for conversation in self.collection.find({'messages': {'$exists': True}}, {'_id': 1}):
+            migrated += self._migrate_in_transaction(conversation['_id'])
+        
+        if migrated:
+            logger.info(f"Moved embedded messages of {migrated} conversations to the messages collection")
+        
+        return migrated
     
     def create_conversation(self, user_id: str, session_id: str, 
                           initial_message: str = None) -> str:
@@ -54,35 +227,88 @@ class MongoDBManager:
         Returns:
             Conversation ID
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
+        now = datetime.now(timezone.utc)
         conversation = {
             'user_id': user_id,
             'session_id': session_id,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
-            'messages': [],
+            'created_at': now,
+            'updated_at': now,
             'metadata': {
                 'language': 'en',
-                'total_messages': 0,
-                'last_activity': datetime.utcnow()
+                'total_messages': 1 if initial_message else 0,
+                'last_activity': now
             }
         }
         
+        result = self.collection.insert_one(conversation)
+        
         if initial_message:
-            conversation['messages'].append({
+            self.messages.insert_one({
+                'conversation_id': str(result.inserted_id),
+                'seq': 1,
                 'message_id': str(ObjectId()),
                 'content': initial_message,
                 'type': 'user',
-                'timestamp': datetime.utcnow(),
+                'timestamp': now,
                 'metadata': {}
             })
-            conversation['metadata']['total_messages'] = 1
         
-        result = self.collection.insert_one(conversation)
         return str(result.inserted_id)
     
+    def _insert_in_batches(self, collection: Collection, documents: List[Dict[str, Any]]) -> List[str]:
+        """Insert documents with unordered insert_many calls of BULK_INSERT_BATCH_SIZE"""
+        inserted_ids = []
+        for start in range(0, len(documents), self.BULK_INSERT_BATCH_SIZE):
+            result = collection.insert_many(documents[start:start + self.BULK_INSERT_BATCH_SIZE], ordered=False)
+            inserted_ids.extend(str(inserted_id) for inserted_id in result.inserted_ids)
+        return inserted_ids
+    
+    def create_conversations_bulk(self, conversations: List[Dict[str, Any]]) -> List[str]:
+        """
+        Create several conversations with batched inserts
+        
+        Args:
+            conversations: Conversations with 'user_id', 'session_id' and optional 'initial_message'
+            
+        Returns:
+            Conversation IDs, in the order of conversations
+        """
+        if self.collection is None:
+            raise Exception("MongoDB not initialized")
+        
+        now = datetime.now(timezone.utc)
+        documents = [{
+            'user_id': conversation['user_id'],
+            'session_id': conversation['session_id'],
+            'created_at': now,
+            'updated_at': now,
+            'metadata': {
+                'language': 'en',
+                'total_messages': 1 if conversation.get('initial_message') else 0,
+                'last_activity': now
+            }
+        } for conversation in conversations]
+        
+        conversation_ids = self._insert_in_batches(self.collection, documents)
+        
+        initial_messages = [{
+            'conversation_id': conversation_id,
+            'seq': 1,
+            'message_id': str(ObjectId()),
+            'content': conversation['initial_message'],
+            'type': 'user',
+            'timestamp': now,
+            'metadata': {}
+        } for conversation_id, conversation in zip(conversation_ids, conversations) if conversation.get('initial_message')]
+        
+        if initial_messages:
+            self._insert_in_batches(self.messages, initial_messages)
+        
+        return conversation_ids
+    
     def add_message(self, conversation_id: str, content: str, message_type: str,
                    metadata: Dict[str, Any] = None) -> str:
         """
@@ -97,33 +323,151 @@ class MongoDBManager:
         Returns:
             Message ID
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
+        # The conversation's message counter hands out the sequence number
+        now = datetime.now(timezone.utc)
+        seq = self._reserve_seq(conversation_id, 1, now)
+        if seq is None:
+            raise Exception(f"Conversation {conversation_id} not found")
+        
         message = {
+            'conversation_id': conversation_id,
+            'seq': seq,
             'message_id': str(ObjectId()),
             'content': content,
             'type': message_type,
-            'timestamp': datetime.utcnow(),
+            'timestamp': now,
             'metadata': metadata or {}
         }
         
-        result = self.collection.update_one(
-            {'_id': ObjectId(conversation_id)},
-            {
-                '$push': {'messages': message},
-                '$set': {
-                    'updated_at': datetime.utcnow(),
-                    'metadata.last_activity': datetime.utcnow(),
-                    'metadata.total_messages': {'$add': ['$metadata.total_messages', 1]}
-                }
-            }
-        )
+        self.messages.insert_one(message)
+        return message['message_id']
+    
+    def add_messages_bulk(self, conversation_id: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """
+        Queue messages for a conversation and write them in batches
+        
+        The messages' sequence numbers are reserved here, with one counter bump,
+        so they keep their place relative to messages added later by add_message.
+        Queued messages from every conversation are written together with one
+        unordered insert_many once MESSAGE_FLUSH_SIZE are pending or
+        MESSAGE_FLUSH_INTERVAL seconds have passed, whichever comes first.
+        Queued messages are not returned by the read methods until they are
+        flushed; call flush_messages() to write them immediately.
+        
+        Args:
+            conversation_id: Conversation ID
+            messages: Messages with 'content', 'type' and optional 'metadata'
+            
+        Returns:
+            Message IDs, in the order of messages
+        """
+        if self.collection is None:
+            raise Exception("MongoDB not initialized")
         
-        if result.matched_count == 0:
+        if not messages:
+            return []
+        
+        # One counter bump reserves a block of sequence numbers for the whole call
+        now = datetime.now(timezone.utc)
+        first_seq = self._reserve_seq(conversation_id, len(messages), now)
+        if first_seq is None:
             raise Exception(f"Conversation {conversation_id} not found")
         
-        return message['message_id']
+        documents = [{
+            'conversation_id': conversation_id,
+            'seq': seq,
+            'message_id': str(ObjectId()),
+            'content': message['content'],
+            'type': message['type'],
+            'timestamp': now,
+            'metadata': message.get('metadata') or {}
+        } for seq, message in enumerate(messages, first_seq)]
+        
+        with self._pending_lock:
+            self._pending_messages.extend(documents)
+            flush_now = len(self._pending_messages) >= self.MESSAGE_FLUSH_SIZE
+            
+            # Start the interval timer with the first message of a batch
+            if not flush_now:
+                self._schedule_flush()
+        
+        if flush_now:
+            self.flush_messages()
+        
+        return [document['message_id'] for document in documents]
+    
+    def _schedule_flush(self):
+        """Start the flush interval timer unless one is running; caller holds _pending_lock"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.MESSAGE_FLUSH_INTERVAL, self._flush_pending)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def flush_messages(self) -> int:
+        """
+        Write all queued messages with a single insert_many
+        
+        Messages that could not be written stay queued and are retried on the next
+        flush. Errors from this flush, and from timer flushes since the last call,
+        are raised here once the writable messages are written.
+        
+        Returns:
+            Number of messages written
+        """
+        written = self._flush_pending()
+        
+        with self._pending_lock:
+            errors = self._flush_errors
+            self._flush_errors = []
+        
+        if errors:
+            raise Exception(f"Error flushing messages: {'; '.join(errors)}")
+        
+        return written
+    
+    def _flush_pending(self) -> int:
+        """Write queued messages, requeueing what failed and recording errors in _flush_errors"""
+        with self._pending_lock:
+            to_insert = self._pending_messages
+            self._pending_messages = []
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        
+        if not to_insert or self.collection is None:
+            return 0
+        
+        errors = []
+        written = 0
+        unwritten = []
+        try:
+            written = len(self.messages.insert_many(to_insert, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Duplicate keys come from an earlier attempt that was written after all
+            failed = {error['index'] for error in e.details['writeErrors'] if error['code'] != 11000}
+            written = len(to_insert) - len(failed)
+            unwritten = [to_insert[index] for index in sorted(failed)]
+            if unwritten:
+                errors.append(f"{len(unwritten)} messages failed to insert: {e}")
+        except Exception as e:
+            unwritten = to_insert
+            errors.append(str(e))
+        
+        if errors:
+            logger.error(f"Error flushing messages: {'; '.join(errors)}")
+        
+        with self._pending_lock:
+            # Queued messages keep their seq, so retrying them leaves no gaps
+            self._pending_messages = unwritten + self._pending_messages
+            self._flush_errors.extend(errors)
+            
+            if self._pending_messages:
+                self._schedule_flush()
+        
+        return written
     
     def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -135,13 +479,22 @@ class MongoDBManager:
         Returns:
             Conversation data or None if not found
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
-        conversation = self.collection.find_one({'_id': ObjectId(conversation_id)})
+        conversation = self.collection.find_one({'_id': _oid(conversation_id)})
         
         if conversation:
+            # A conversation written before messages had their own collection is
+            # moved over on first read, so its history is not dropped
+            if 'messages' in conversation:
+                self._migrate_in_transaction(conversation['_id'])
+                conversation = self.collection.find_one({'_id': conversation['_id']})
+            
             conversation['_id'] = str(conversation['_id'])
+            conversation['messages'] = list(
+                self.messages.find({'conversation_id': conversation_id}, self._MESSAGE_PROJECTION).sort('seq', 1)
+            )
             return conversation
         
         return None
@@ -159,18 +512,54 @@ class MongoDBManager:
         Returns:
             List of messages
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
-        conversation = self.collection.find_one(
-            {'_id': ObjectId(conversation_id)},
-            {'messages': {'$slice': [offset, limit]}}
-        )
+        # Message N has seq N, so the offset becomes an indexed range instead of a skip
+        messages = self.messages.find(
+            {'conversation_id': conversation_id, 'seq': {'$gt': offset}},
+            self._MESSAGE_PROJECTION
+        ).sort('seq', 1).limit(limit)
         
-        if conversation and 'messages' in conversation:
-            return conversation['messages']
+        return list(messages)
+    
+    def get_conversation_messages_after(self, conversation_id: str, after_message_id: str = None,
+                                        limit: int = 50) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the page of messages that follows a given message
         
-        return []
+        Keyset alternative to the offset in get_conversation_messages: pass the
+        last message_id of the previous page to get the next one.
+        
+        Args:
+            conversation_id: Conversation ID
+            after_message_id: Last message ID already seen (None for the first page)
+            limit: Maximum number of messages to return
+            
+        Returns:
+            List of messages, or None if after_message_id is not a message of the
+            conversation (restarting from the first page would repeat messages)
+        """
+        if self.collection is None:
+            raise Exception("MongoDB not initialized")
+        
+        # Start right after the last seen message
+        after_seq = 0
+        if after_message_id:
+            anchor = self.messages.find_one(
+                {'message_id': after_message_id, 'conversation_id': conversation_id},
+                {'seq': 1}
+            )
+            if anchor is None:
+                return None
+            after_seq = anchor['seq']
+        
+        messages = self.messages.find(
+            {'conversation_id': conversation_id, 'seq': {'$gt': after_seq}},
+            self._MESSAGE_PROJECTION
+        ).sort('seq', 1).limit(limit)
+        
+        return list(messages)
     
     def update_conversation_metadata(self, conversation_id: str, 
                                    metadata: Dict[str, Any]) -> bool:
@@ -184,17 +573,19 @@ class MongoDBManager:
         Returns:
             True if successful, False otherwise
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
+        # Dotted paths touch only the given fields and keep the rest of metadata
+        # (total_messages in particular) intact
+        now = datetime.now(timezone.utc)
+        update_fields = {f'metadata.{key}': value for key, value in metadata.items()}
+        update_fields['metadata.last_activity'] = now
+        update_fields['updated_at'] = now
+        
         result = self.collection.update_one(
-            {'_id': ObjectId(conversation_id)},
-            {
-                '$set': {
-                    'updated_at': datetime.utcnow(),
-                    'metadata': {**metadata, 'last_activity': datetime.utcnow()}
-                }
-            }
+            {'_id': _oid(conversation_id)},
+            {'$set': update_fields}
         )
         
         return result.matched_count > 0
@@ -210,11 +601,12 @@ class MongoDBManager:
         Returns:
             List of conversations
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
         conversations = self.collection.find(
-            {'user_id': user_id}
+            {'user_id': user_id},
+            self._CONVERSATION_SUMMARY_PROJECTION
         ).sort('updated_at', -1).limit(limit)
         
         result = []
@@ -225,25 +617,38 @@ class MongoDBManager:
         return result
     
     def search_conversations(self, query: Dict[str, Any], 
-                           limit: int = 20) -> List[Dict[str, Any]]:
+                           limit: int = 20, projection: Optional[Dict[str, Any]] = None,
+                           hint: Optional[Union[str, List[Tuple[str, int]]]] = None) -> List[Dict[str, Any]]:
         """
         Search conversations by query
         
+        A projection that excludes _id and keeps only fields of one index (e.g.
+        {'_id': 0, 'user_id': 1, 'updated_at': 1} for a user_id/updated_at query)
+        is answered from the index alone, without fetching any documents.
+        
         Args:
             query: MongoDB query dictionary
             limit: Maximum number of results
+            projection: Fields to return (defaults to the conversation summary fields)
+            hint: Index name or key pattern to use, skipping query planning
             
         Returns:
             List of matching conversations
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
-        conversations = self.collection.find(query).limit(limit)
+        if projection is None:
+            projection = self._CONVERSATION_SUMMARY_PROJECTION
+        
+        conversations = self.collection.find(query, projection).limit(limit)
+        if hint is not None:
+            conversations = conversations.hint(hint)
         
         result = []
         for conv in conversations:
-            conv['_id'] = str(conv['_id'])
+            if '_id' in conv:
+                conv['_id'] = str(conv['_id'])
             result.append(conv)
         
         return result
@@ -258,12 +663,62 @@ class MongoDBManager:
         Returns:
             True if successful, False otherwise
         """
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
-        result = self.collection.delete_one({'_id': ObjectId(conversation_id)})
+        result = self.collection.delete_one({'_id': _oid(conversation_id)})
+        self.messages.delete_many({'conversation_id': conversation_id})
         return result.deleted_count > 0
     
+    def purge_orphaned_messages(self) -> int:
+        """
+        Delete messages whose conversation no longer exists
+        
+        Conversations expire through their TTL index; their messages are removed
+        here, together, instead of each message expiring on its own timestamp.
+        
+        Returns:
+            Number of messages deleted
+        """
+        if self.collection is None:
+            raise Exception("MongoDB not initialized")
+        
+        # Distinct conversation IDs, streamed from the (conversation_id, seq) index
+        conversation_ids = self.messages.aggregate([
+            {'$sort': {'conversation_id': 1}},
+            {'$group': {'_id': '$conversation_id'}}
+        ])
+        
+        deleted = 0
+        batch = []
+        for group in conversation_ids:
+            batch.append(group['_id'])
+            if len(batch) == self.ORPHAN_SWEEP_BATCH_SIZE:
+                deleted += self._purge_orphaned_batch(batch)
+                batch = []
+        if batch:
+            deleted += self._purge_orphaned_batch(batch)
+        
+        if deleted:
+            logger.info(f"Deleted {deleted} messages of expired conversations")
+        
+        return deleted
+    
+    def _purge_orphaned_batch(self, conversation_ids: List[str]) -> int:
+        """Delete the messages of those conversation_ids that have no conversation document"""
+        existing = {
+            str(conversation['_id'])
+            for conversation in self.collection.find(
+                {'_id': {'$in': [_oid(conversation_id) for conversation_id in conversation_ids]}},
+                {'_id': 1}
+            )
+        }
+        orphaned = [conversation_id for conversation_id in conversation_ids if conversation_id not in existing]
+        if not orphaned:
+            return 0
+        
+        return self.messages.delete_many({'conversation_id': {'$in': orphaned}}).deleted_count
+    
     def store_medical_data(self, data: Dict[str, Any], 
                           data_type: str = "medical_knowledge") -> str:
         """
@@ -276,24 +731,64 @@ class MongoDBManager:
         Returns:
             Document ID
         """
-        if not self.database:
+        if self.database is None:
             raise Exception("MongoDB not initialized")
         
-        medical_collection = self.database['medical_data']
+        medical_collection = self.database['medical_data'].with_options(
+            write_concern=WriteConcern(w='majority', j=True)
+        )
         
+        now = datetime.now(timezone.utc)
         document = {
             'data_type': data_type,
             'content': data.get('content', ''),
             'metadata': data.get('metadata', {}),
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
         
         result = medical_collection.insert_one(document)
         return str(result.inserted_id)
     
+    @staticmethod
+    def _stream_documents(cursor) -> Iterator[Dict[str, Any]]:
+        """Yield cursor documents with string IDs as they arrive"""
+        for doc in cursor:
+            doc['_id'] = str(doc['_id'])
+            yield doc
+    
+    def store_medical_data_bulk(self, data: List[Dict[str, Any]],
+                                data_type: str = "medical_knowledge") -> List[str]:
+        """
+        Store several medical documents with batched inserts
+        
+        Args:
+            data: Medical data to store, each shaped like store_medical_data's data
+            data_type: Type of medical data
+            
+        Returns:
+            Document IDs, in the order of data
+        """
+        if self.database is None:
+            raise Exception("MongoDB not initialized")
+        
+        medical_collection = self.database['medical_data'].with_options(
+            write_concern=WriteConcern(w='majority', j=True)
+        )
+        
+        now = datetime.now(timezone.utc)
+        documents = [{
+            'data_type': data_type,
+            'content': item.get('content', ''),
+            'metadata': item.get('metadata', {}),
+            'created_at': now,
+            'updated_at': now
+        } for item in data]
+        
+        return self._insert_in_batches(medical_collection, documents)
+    
     def get_medical_data(self, data_type: str = None, 
-                        limit: int = 100) -> List[Dict[str, Any]]:
+                        limit: int = 100) -> Iterator[Dict[str, Any]]:
         """
         Get medical data
         
@@ -302,9 +797,9 @@ class MongoDBManager:
             limit: Maximum number of documents to return
             
         Returns:
-            List of medical data documents
+            Iterator over medical data documents, fetched in batches as it is consumed
         """
-        if not self.database:
+        if self.database is None:
             raise Exception("MongoDB not initialized")
         
         medical_collection = self.database['medical_data']
@@ -313,14 +808,8 @@ class MongoDBManager:
         if data_type:
             query['data_type'] = data_type
         
-        documents = medical_collection.find(query).limit(limit)
-        
-        result = []
-        for doc in documents:
-            doc['_id'] = str(doc['_id'])
-            result.append(doc)
-        
-        return result
+        documents = medical_collection.find(query).limit(limit).batch_size(self.STREAM_BATCH_SIZE)
+        return self._stream_documents(documents)
     
     def store_user_feedback(self, conversation_id: str, message_id: str,
                           feedback: Dict[str, Any]) -> str:
@@ -335,7 +824,7 @@ class MongoDBManager:
         Returns:
             Feedback ID
         """
-        if not self.database:
+        if self.database is None:
             raise Exception("MongoDB not initialized")
         
         feedback_collection = self.database['user_feedback']
@@ -344,14 +833,14 @@ class MongoDBManager:
             'conversation_id': conversation_id,
             'message_id': message_id,
             'feedback': feedback,
-            'created_at': datetime.utcnow()
+            'created_at': datetime.now(timezone.utc)
         }
         
         result = feedback_collection.insert_one(feedback_doc)
         return str(result.inserted_id)
     
     def get_user_feedback(self, conversation_id: str = None,
-                         limit: int = 100) -> List[Dict[str, Any]]:
+                         limit: int = 100) -> Iterator[Dict[str, Any]]:
         """
         Get user feedback
         
@@ -360,9 +849,9 @@ class MongoDBManager:
             limit: Maximum number of feedback entries to return
             
         Returns:
-            List of feedback entries
+            Iterator over feedback entries, fetched in batches as it is consumed
         """
-        if not self.database:
+        if self.database is None:
             raise Exception("MongoDB not initialized")
         
         feedback_collection = self.database['user_feedback']
@@ -371,35 +860,80 @@ class MongoDBManager:
         if conversation_id:
             query['conversation_id'] = conversation_id
         
-        feedback_entries = feedback_collection.find(query).limit(limit)
-        
-        result = []
-        for entry in feedback_entries:
-            entry['_id'] = str(entry['_id'])
-            result.append(entry)
-        
-        return result
+        feedback_entries = feedback_collection.find(query).limit(limit).batch_size(self.STREAM_BATCH_SIZE)
+        return self._stream_documents(feedback_entries)
     
     def create_indexes(self):
         """Create useful indexes for better performance"""
-        if not self.collection:
+        if self.collection is None:
             raise Exception("MongoDB not initialized")
         
         try:
-            # Create indexes
-            self.collection.create_index("user_id")
-            self.collection.create_index("session_id")
-            self.collection.create_index("created_at")
-            self.collection.create_index("updated_at")
+            # Compound indexes in equality-sort-range order; their prefixes also
+            # serve plain user_id / session_id lookups
             self.collection.create_index([("user_id", 1), ("updated_at", -1)])
+            self.collection.create_index([("user_id", 1), ("created_at", -1)])
+            self.collection.create_index([("session_id", 1), ("updated_at", -1)])
+            self.database['medical_data'].create_index([("data_type", 1), ("created_at", -1)])
+            self.database['user_feedback'].create_index([("conversation_id", 1), ("created_at", -1)])
+            
+            # Single-field indexes superseded by the compounds only add write overhead, and
+            # the text index on embedded messages is unused once they have been migrated
+            existing_indexes = self.collection.index_information()
+            for index_name in ("user_id_1", "session_id_1", "created_at_1", "updated_at_1",
+                               "messages.content_text"):
+                if index_name in existing_indexes:
+                    self.collection.drop_index(index_name)
+            
+            # Messages are read in seq order per conversation and looked up by ID for paging
+            self.messages.create_index([("conversation_id", 1), ("seq", 1)], unique=True)
+            self.messages.create_index("message_id", unique=True)
+            
+            # Metadata-only vector searches filter on these fields
+            self.vector_metadata.create_index("category")
+            self.vector_metadata.create_index("document_type")
             
             # Create text index for message content search
-            self.collection.create_index([("messages.content", "text")])
+            self.messages.create_index([("content", "text")])
+            
+            # A TTL on message timestamps would cut the early history out of live conversations
+            if "timestamp_1" in self.messages.index_information():
+                self.messages.drop_index("timestamp_1")
             
-            print("Indexes created successfully")
+            self._sync_conversation_ttl()
+            
+            logger.info("Indexes created successfully")
             
         except Exception as e:
-            print(f"Error creating indexes: {e}")
+            logger.error(f"Error creating indexes: {e}")
+    
+    def _sync_conversation_ttl(self):
+        """
+        Make the conversation TTL index match settings.CONVERSATION_TTL_SECONDS
+        
+        The TTL index lets the server expire idle conversations in the background;
+        their messages are removed by purge_orphaned_messages. A changed window is
+        applied in place with collMod, and a window of 0 drops the index.
+        """
+        ttl = settings.CONVERSATION_TTL_SECONDS
+        existing = self.collection.index_information().get("metadata.last_activity_1")
+        
+        if not ttl:
+            if existing is not None and 'expireAfterSeconds' in existing:
+                self.collection.drop_index("metadata.last_activity_1")
+            return
+        
+        if existing is None:
+            self.collection.create_index("metadata.last_activity", expireAfterSeconds=ttl)
+        elif 'expireAfterSeconds' not in existing:
+            # A plain index on the field cannot be given a TTL in place
+            self.collection.drop_index("metadata.last_activity_1")
+            self.collection.create_index("metadata.last_activity", expireAfterSeconds=ttl)
+        elif existing['expireAfterSeconds'] != ttl:
+            self.database.command('collMod', self.collection.name, index={
+                'keyPattern': {'metadata.last_activity': 1},
+                'expireAfterSeconds': ttl
+            })
     
     def get_database_stats(self) -> Dict[str, Any]:
         """
@@ -408,7 +942,7 @@ class MongoDBManager:
         Returns:
             Dictionary with database statistics
         """
-        if not self.database:
+        if self.database is None:
             return {"error": "MongoDB not initialized"}
         
         try:
@@ -426,10 +960,17 @@ class MongoDBManager:
         except Exception as e:
             return {"error": f"Error getting database stats: {e}"}
     
+    def health_check_lite(self):
+        """Round-trip a ping to the server; raises if it is unreachable"""
+        self.client.admin.command('ping')
+    
     def health_check(self) -> Dict[str, Any]:
         """
         Perform health check on MongoDB connection
         
+        Only pings the server; dbStats walks every collection, so database
+        statistics are left to get_database_stats.
+        
         Returns:
             Health check results
         """
@@ -442,16 +983,12 @@ class MongoDBManager:
                 }
             
             # Test connection
-            self.client.admin.command('ping')
-            
-            # Get basic stats
-            stats = self.get_database_stats()
+            self.health_check_lite()
             
             return {
                 'status': 'healthy',
                 'message': 'MongoDB connection successful',
-                'connected': True,
-                'database_stats': stats
+                'connected': True
             }
             
         except Exception as e:
@@ -462,11 +999,21 @@ class MongoDBManager:
             }
     
     def close_connection(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
-            print("MongoDB connection closed")
+        """Close MongoDB connection, raising if queued messages could not be written"""
+        try:
+            self.flush_messages()
+        finally:
+            with self._pending_lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            if self.client:
+                self.client.close()
+                logger.info("MongoDB connection closed")
     
     def __del__(self):
         """Destructor to close connection"""
-        self.close_connection()
+        try:
+            self.close_connection()
+        except Exception as e:
+            logger.error(f"Error closing MongoDB connection: {e}")
@@ -1,11 +1,18 @@
 import pinecone
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 import json
+import logging
+import threading
+from collections import OrderedDict
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class VectorDocument:
     """Represents a document with vector embedding"""
@@ -14,17 +21,71 @@ class VectorDocument:
     vector: List[float]
     metadata: Dict[str, Any]
 
+@dataclass
+class VectorBatch:
+    """Represents documents column-wise, with every vector in one float32 (N, D) array"""
+    ids: List[str]
+    vectors: np.ndarray
+    contents: List[str]
+    metadatas: List[Dict[str, Any]]
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @cached_property
+    def stored_metadatas(self) -> List[Dict[str, Any]]:
+        """Metadata as stored with each vector (content merged in), built once per batch"""
+        return [{'content': content, **metadata} for content, metadata in zip(self.contents, self.metadatas)]
+    
+    @classmethod
+    def from_documents(cls, documents: List[VectorDocument]) -> "VectorBatch":
+        """Build a batch from VectorDocument objects"""
+        return cls(
+            ids=[doc.id for doc in documents],
+            vectors=np.asarray([doc.vector for doc in documents], dtype=np.float32),
+            contents=[doc.content for doc in documents],
+            metadatas=[doc.metadata for doc in documents]
+        )
+
 class PineconeManager:
     """
     Manages Pinecone vector database operations
     """
     
-    def __init__(self):
-        """Initialize Pinecone manager"""
+    # Upsert requests kept in flight at once by upsert_documents and batch_upsert
+    UPSERT_CONCURRENCY = 20
+    
+    # Documents kept by get_document, with vectors stored as int8 (a quarter of float32)
+    DOCUMENT_CACHE_SIZE = 1024
+    
+    # IDs per fetch and mirror write when backfilling the metadata store
+    BACKFILL_BATCH_SIZE = 100
+    
+    # Most IDs a single query returns; bounds the backfill on clients without index.list
+    QUERY_TOP_K_LIMIT = 10000
+    
+    def __init__(self, metadata_store=None):
+        """
+        Initialize Pinecone manager
+        
+        Args:
+            metadata_store: Optional MongoDB collection mirroring each vector's metadata
+                by ID, so search_by_metadata can filter there and fetch the matches
+        """
         self.api_key = settings.PINECONE_API_KEY
         self.environment = settings.PINECONE_ENV
         self.index_name = settings.PINECONE_INDEX_NAME
         self.index = None
+        self.metadata_store = metadata_store
+        # Whether the store is known to hold every vector; until then metadata
+        # searches fall back to a filtered query against Pinecone
+        self._metadata_store_complete = False
+        # Zero query vector for metadata-only searches, sized from the index on first use
+        self._zero_vector: Optional[List[float]] = None
+        
+        # id -> (content, metadata, int8 vector, scale)
+        self._document_cache: "OrderedDict[str, Tuple[str, Dict[str, Any], np.ndarray, float]]" = OrderedDict()
+        self._document_cache_lock = threading.Lock()
         
         if self.api_key and self.environment:
             self._initialize_pinecone()
@@ -39,12 +100,12 @@ class PineconeManager:
             
             # Check if index exists
             if self.index_name in pinecone.list_indexes():
-                self.index = pinecone.Index(self.index_name)
+                self.index = self._open_index()
             else:
-                print(f"Index {self.index_name} not found. Please create it first.")
+                logger.warning(f"Index {self.index_name} not found. Please create it first.")
                 
         except Exception as e:
-            print(f"Error initializing Pinecone: {e}")
+            logger.error(f"Error initializing Pinecone: {e}")
     
     def create_index(self, dimension: int = 384, metric: str = "cosine") -> bool:
         """
@@ -59,7 +120,7 @@ class PineconeManager:
         """
         try:
             if self.index_name in pinecone.list_indexes():
-                print(f"Index {self.index_name} already exists")
+                logger.info(f"Index {self.index_name} already exists")
                 return True
             
             pinecone.create_index(
@@ -72,51 +133,193 @@ class PineconeManager:
             import time
             time.sleep(10)
             
-            self.index = pinecone.Index(self.index_name)
+            self.index = self._open_index()
+            self._zero_vector = np.zeros(dimension, dtype=np.float32).tolist()
             return True
             
         except Exception as e:
-            print(f"Error creating index: {e}")
+            logger.error(f"Error creating index: {e}")
             return False
     
-    def upsert_documents(self, documents: List[VectorDocument]) -> bool:
+    def _open_index(self):
+        """Open the index over gRPC when pinecone-client[grpc] is installed, else over REST"""
+        # The gRPC client serializes vectors with protobuf instead of JSON
+        grpc_index = getattr(pinecone, 'GRPCIndex', None)
+        if grpc_index is not None:
+            return grpc_index(self.index_name)
+        return pinecone.Index(self.index_name)
+    
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize vectors to int8 with one symmetric scale per vector
+        
+        Args:
+            vectors: A vector, or an (N, D) array of vectors
+            
+        Returns:
+            int8 values and the scale of each vector (dequantize with values * scale)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scale = np.abs(vectors).max(axis=-1, keepdims=True) / 127.0
+        # All-zero vectors keep a unit scale so they quantize to zeros
+        scale[scale == 0] = 1.0
+        quantized = np.rint(vectors / scale).astype(np.int8)
+        return quantized, scale.squeeze(-1)
+    
+    @staticmethod
+    def dequantize(quantized: np.ndarray, scale) -> np.ndarray:
+        """Restore float32 vectors from quantize() output"""
+        return quantized.astype(np.float32) * np.expand_dims(np.asarray(scale, dtype=np.float32), -1)
+    
+    def _forget_documents(self, document_ids):
+        """Drop documents from the get_document cache"""
+        with self._document_cache_lock:
+            for document_id in document_ids:
+                self._document_cache.pop(document_id, None)
+    
+    def _get_zero_vector(self) -> List[float]:
+        """Zero vector matching the index dimension, looked up once"""
+        if self._zero_vector is None:
+            dimension = self.index.describe_index_stats()['dimension']
+            self._zero_vector = np.zeros(dimension, dtype=np.float32).tolist()
+        return self._zero_vector
+    
+    def _mirror_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> bool:
+        """Write the metadata of upserted vectors (without their content) to the metadata store"""
+        if self.metadata_store is None or not ids:
+            return True
+        
+        from pymongo import ReplaceOne
+        
+        try:
+            self.metadata_store.bulk_write([
+                ReplaceOne({'_id': doc_id}, metadata, upsert=True)
+                for doc_id, metadata in zip(ids, metadatas)
+            ], ordered=False)
+            return True
+        except Exception as e:
+            # A vector missing from the store would be missed by filtered searches
+            self._metadata_store_complete = False
+            logger.error(f"Error mirroring metadata: {e}")
+            return False
+    
+    def _unmirror_metadata(self, document_ids: List[str]):
+        """Remove deleted vectors from the metadata store"""
+        if self.metadata_store is None:
+            return
+        
+        try:
+            self.metadata_store.delete_many({'_id': {'$in': list(document_ids)}})
+        except Exception as e:
+            logger.error(f"Error mirroring metadata: {e}")
+    
+    def _is_metadata_store_complete(self) -> bool:
+        """Whether the metadata store holds an entry for every vector in the index"""
+        if self.metadata_store is None:
+            return False
+        
+        if not self._metadata_store_complete:
+            total = self.index.describe_index_stats().get('total_vector_count', 0)
+            self._metadata_store_complete = self.metadata_store.count_documents({}) >= total
+        return self._metadata_store_complete
+    
+    def _list_ids(self) -> List[str]:
+        """IDs of the vectors in the index, as far as the client can enumerate them"""
+        # Newer clients page through every ID; pinecone-client 2.x can only return
+        # the top QUERY_TOP_K_LIMIT matches of a query
+        if hasattr(self.index, 'list'):
+            return [doc_id for page in self.index.list() for doc_id in page]
+        
+        results = self.index.query(vector=self._get_zero_vector(), top_k=self.QUERY_TOP_K_LIMIT)
+        return [match['id'] for match in results['matches']]
+    
+    def backfill_metadata_store(self) -> int:
+        """
+        Copy the metadata of vectors already in the index into the metadata store
+        
+        Vectors upserted before the store was configured are fetched in batches
+        of BACKFILL_BATCH_SIZE and mirrored. search_by_metadata uses the store
+        only once it covers the whole index.
+        
+        Returns:
+            Number of vectors mirrored
+        """
+        if not self.index or self.metadata_store is None:
+            logger.warning("Index or metadata store not initialized")
+            return 0
+        
+        try:
+            ids = self._list_ids()
+            mirrored = 0
+            for start in range(0, len(ids), self.BACKFILL_BATCH_SIZE):
+                vectors = self.index.fetch(ids=ids[start:start + self.BACKFILL_BATCH_SIZE])['vectors']
+                if self._mirror_metadata(list(vectors.keys()), [
+                    {k: v for k, v in vector['metadata'].items() if k != 'content'}
+                    for vector in vectors.values()
+                ]):
+                    mirrored += len(vectors)
+            
+            self._metadata_store_complete = False
+            if not self._is_metadata_store_complete():
+                logger.warning("Metadata store does not cover the whole index; "
+                               "metadata searches keep querying Pinecone")
+            return mirrored
+            
+        except Exception as e:
+            logger.error(f"Error backfilling metadata store: {e}")
+            return 0
+    
+    def _upsert_all(self, documents: VectorBatch, batch_size: int, report_progress: bool = False):
+        """Upsert a batch in slices of batch_size with up to UPSERT_CONCURRENCY requests in flight"""
+        starts = range(0, len(documents), batch_size)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.UPSERT_CONCURRENCY, len(starts)))) as executor:
+            # Later payloads are built while earlier requests are still on the wire
+            futures = [
+                executor.submit(self.index.upsert, vectors=self._upsert_payload(documents, start, start + batch_size))
+                for start in starts
+            ]
+            
+            for number, future in enumerate(futures, 1):
+                future.result()
+                if report_progress:
+                    logger.info(f"Upserted batch {number}/{len(starts)}")
+    
+    @staticmethod
+    def _upsert_payload(batch: VectorBatch, start: int, stop: int) -> List[Tuple[str, List[float], Dict[str, Any]]]:
+        """Build the upsert vectors for rows start:stop of a batch as (id, values, metadata) tuples"""
+        # One tolist() call converts the whole slice of the float32 matrix
+        values = batch.vectors[start:stop].tolist()
+        return list(zip(batch.ids[start:stop], values, batch.stored_metadatas[start:stop]))
+    
+    def upsert_documents(self, documents: Union[List[VectorDocument], VectorBatch]) -> bool:
         """
         Upsert documents to Pinecone index
         
         Args:
-            documents: List of VectorDocument objects
+            documents: List of VectorDocument objects, or a VectorBatch
             
         Returns:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
-            # Prepare vectors for upsert
-            vectors = []
-            for doc in documents:
-                vector_data = {
-                    'id': doc.id,
-                    'values': doc.vector,
-                    'metadata': {
-                        'content': doc.content,
-                        **doc.metadata
-                    }
-                }
-                vectors.append(vector_data)
+            if not isinstance(documents, VectorBatch):
+                documents = VectorBatch.from_documents(documents)
+            self._forget_documents(documents.ids)
             
             # Upsert in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            self._upsert_all(documents, batch_size=100)
+            self._mirror_metadata(documents.ids, documents.metadatas)
             
             return True
             
         except Exception as e:
-            print(f"Error upserting documents: {e}")
+            logger.error(f"Error upserting documents: {e}")
             return False
     
     def search(self, query_vector: List[float], top_k: int = 5, 
@@ -133,7 +336,7 @@ class PineconeManager:
             List of search results
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return []
         
         try:
@@ -161,38 +364,63 @@ class PineconeManager:
             return formatted_results
             
         except Exception as e:
-            print(f"Error searching: {e}")
+            logger.error(f"Error searching: {e}")
             return []
     
-    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+    def get_document(self, document_id: str, include_vector: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get a specific document by ID
         
         Args:
             document_id: Document ID
+            include_vector: Also return the vector (restored from its cached int8 form)
             
         Returns:
             Document data or None if not found
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return None
         
         try:
-            results = self.index.fetch(ids=[document_id])
+            with self._document_cache_lock:
+                cached = self._document_cache.get(document_id)
+                if cached is not None:
+                    self._document_cache.move_to_end(document_id)
             
-            if document_id in results['vectors']:
+            if cached is None:
+                results = self.index.fetch(ids=[document_id])
+                
+                if document_id not in results['vectors']:
+                    return None
+                
                 vector_data = results['vectors'][document_id]
-                return {
-                    'id': vector_data['id'],
-                    'content': vector_data['metadata'].get('content', ''),
-                    'metadata': {k: v for k, v in vector_data['metadata'].items() if k != 'content'}
-                }
+                quantized, scale = self.quantize(vector_data['values'])
+                cached = (
+                    vector_data['metadata'].get('content', ''),
+                    {k: v for k, v in vector_data['metadata'].items() if k != 'content'},
+                    quantized,
+                    float(scale)
+                )
+                
+                with self._document_cache_lock:
+                    self._document_cache[document_id] = cached
+                    if len(self._document_cache) > self.DOCUMENT_CACHE_SIZE:
+                        self._document_cache.popitem(last=False)
+            
+            content, metadata, quantized, scale = cached
+            document = {
+                'id': document_id,
+                'content': content,
+                'metadata': dict(metadata)
+            }
+            if include_vector:
+                document['vector'] = self.dequantize(quantized, scale).tolist()
             
-            return None
+            return document
             
         except Exception as e:
-            print(f"Error fetching document: {e}")
+            logger.error(f"Error fetching document: {e}")
             return None
     
     def update_document(self, document_id: str, content: str = None, 
@@ -209,14 +437,14 @@ class PineconeManager:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
             # Get existing document
             existing = self.get_document(document_id)
             if not existing:
-                print(f"Document {document_id} not found")
+                logger.warning(f"Document {document_id} not found")
                 return False
             
             # Update fields
@@ -228,11 +456,11 @@ class PineconeManager:
             
             # Note: Pinecone doesn't support partial updates, so we need to re-upsert
             # This requires the vector to be regenerated
-            print("Warning: Document update requires vector regeneration")
+            logger.warning("Document update requires vector regeneration")
             return False
             
         except Exception as e:
-            print(f"Error updating document: {e}")
+            logger.error(f"Error updating document: {e}")
             return False
     
     def delete_document(self, document_id: str) -> bool:
@@ -246,15 +474,17 @@ class PineconeManager:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
             self.index.delete(ids=[document_id])
+            self._forget_documents([document_id])
+            self._unmirror_metadata([document_id])
             return True
             
         except Exception as e:
-            print(f"Error deleting document: {e}")
+            logger.error(f"Error deleting document: {e}")
             return False
     
     def delete_documents(self, document_ids: List[str]) -> bool:
@@ -268,15 +498,17 @@ class PineconeManager:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
             self.index.delete(ids=document_ids)
+            self._forget_documents(document_ids)
+            self._unmirror_metadata(document_ids)
             return True
             
         except Exception as e:
-            print(f"Error deleting documents: {e}")
+            logger.error(f"Error deleting documents: {e}")
             return False
     
     def get_index_stats(self) -> Dict[str, Any]:
@@ -287,7 +519,7 @@ class PineconeManager:
             Dictionary with index statistics
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return {}
         
         try:
@@ -300,7 +532,7 @@ class PineconeManager:
             }
             
         except Exception as e:
-            print(f"Error getting index stats: {e}")
+            logger.error(f"Error getting index stats: {e}")
             return {}
     
     def search_by_metadata(self, filter_dict: Dict[str, Any], 
@@ -308,6 +540,11 @@ class PineconeManager:
         """
         Search by metadata filters only
         
+        With a metadata store that covers the index, the filter runs there as an
+        indexed MongoDB query (Pinecone's filter operators are MongoDB's) and the
+        matched IDs are fetched from Pinecone; matches carry no score. Otherwise
+        Pinecone is queried with a zero vector and the filter.
+        
         Args:
             filter_dict: Metadata filter dictionary
             top_k: Number of results to return
@@ -316,15 +553,33 @@ class PineconeManager:
             List of matching documents
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return []
         
         try:
-            # Create a dummy vector for metadata-only search
-            dummy_vector = [0.0] * 384  # Assuming 384 dimensions
-            
+            if self._is_metadata_store_complete():
+                ids = [doc['_id'] for doc in self.metadata_store.find(filter_dict, {'_id': 1}).limit(top_k)]
+                if not ids:
+                    return []
+                
+                # Keep the store's order; IDs deleted from Pinecone elsewhere are skipped
+                vectors = self.index.fetch(ids=ids)['vectors']
+                formatted_results = []
+                for doc_id in ids:
+                    if doc_id not in vectors:
+                        continue
+                    metadata = vectors[doc_id]['metadata']
+                    formatted_results.append({
+                        'id': doc_id,
+                        'score': None,
+                        'content': metadata.get('content', ''),
+                        'metadata': {k: v for k, v in metadata.items() if k != 'content'}
+                    })
+                return formatted_results
+            
+            # Dummy vector for metadata-only search, sized to the index
             results = self.index.query(
-                vector=dummy_vector,
+                vector=self._get_zero_vector(),
                 top_k=top_k,
                 filter=filter_dict,
                 include_metadata=True
@@ -343,51 +598,37 @@ class PineconeManager:
             return formatted_results
             
         except Exception as e:
-            print(f"Error searching by metadata: {e}")
+            logger.error(f"Error searching by metadata: {e}")
             return []
     
-    def batch_upsert(self, documents: List[VectorDocument], 
+    def batch_upsert(self, documents: Union[List[VectorDocument], VectorBatch], 
                     batch_size: int = 100) -> bool:
         """
         Upsert documents in batches
         
         Args:
-            documents: List of VectorDocument objects
+            documents: List of VectorDocument objects, or a VectorBatch
             batch_size: Batch size for processing
             
         Returns:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                
-                # Prepare batch vectors
-                vectors = []
-                for doc in batch:
-                    vector_data = {
-                        'id': doc.id,
-                        'values': doc.vector,
-                        'metadata': {
-                            'content': doc.content,
-                            **doc.metadata
-                        }
-                    }
-                    vectors.append(vector_data)
-                
-                # Upsert batch
-                self.index.upsert(vectors=vectors)
-                
-                print(f"Upserted batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
+            if not isinstance(documents, VectorBatch):
+                documents = VectorBatch.from_documents(documents)
+            self._forget_documents(documents.ids)
+            
+            self._upsert_all(documents, batch_size, report_progress=True)
+            self._mirror_metadata(documents.ids, documents.metadatas)
             
             return True
             
         except Exception as e:
-            print(f"Error in batch upsert: {e}")
+            logger.error(f"Error in batch upsert: {e}")
             return False
     
     def create_namespace(self, namespace: str) -> bool:
@@ -412,7 +653,7 @@ class PineconeManager:
             List of namespace names
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return []
         
         try:
@@ -420,7 +661,7 @@ class PineconeManager:
             return list(stats.get('namespaces', {}).keys())
             
         except Exception as e:
-            print(f"Error listing namespaces: {e}")
+            logger.error(f"Error listing namespaces: {e}")
             return []
     
     def clear_index(self) -> bool:
@@ -431,7 +672,7 @@ class PineconeManager:
             True if successful, False otherwise
         """
         if not self.index:
-            print("Index not initialized")
+            logger.warning("Index not initialized")
             return False
         
         try:
@@ -442,12 +683,12 @@ class PineconeManager:
             if stats.get('total_vector_count', 0) == 0:
                 return True
             
-            print("Warning: Clearing index will delete all vectors")
+            logger.warning("Clearing index will delete all vectors")
             # For safety, we'll not implement automatic clearing
             return False
             
         except Exception as e:
-            print(f"Error clearing index: {e}")
+            logger.error(f"Error clearing index: {e}")
             return False
     
     def health_check(self) -> Dict[str, Any]:
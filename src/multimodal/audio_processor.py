@@ -1,10 +1,18 @@
 import whisper
 import librosa
+import soundfile
 import numpy as np
-from typing import Dict, Any, Optional, Tuple
+from scipy.fft import dct
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
-import tempfile
 import os
+import subprocess
+import threading
+import time
+import torch
 from config.settings import settings
 
 class AudioProcessor:
@@ -12,37 +20,235 @@ class AudioProcessor:
     Audio processing for speech-to-text and audio analysis
     """
     
-    def __init__(self, model_size: str = "base"):
+    # Features extract_audio_features can compute, in the order they are returned
+    AUDIO_FEATURES = ("rms_energy", "zero_crossing_rate", "spectral_centroid", "spectral_rolloff", "mfcc", "tempo")
+    
+    # Feature dicts kept by extract_audio_features, keyed by a digest of the audio bytes
+    FEATURE_CACHE_SIZE = 32
+    
+    # Decoded waveforms kept by _load_audio, keyed by audio digest and sample rate
+    DECODE_CACHE_SIZE = 8
+    
+    # Seconds after a failed model load before a request tries loading again
+    MODEL_RETRY_INTERVAL = 60.0
+    
+    # Emotion rules: a rule fires when every feature lies strictly between its lower and
+    # upper bound, and then adds its row of _EMOTION_WEIGHTS to the emotion scores
+    _EMOTIONS = ("calm", "stressed", "excited", "sad", "angry")
+    _EMOTION_FEATURES = ("rms_energy", "zero_crossing_rate", "spectral_centroid", "tempo")
+    _EMOTION_LOWER = np.array([
+        [0.1, -np.inf, -np.inf, 120.0],        # high energy and tempo: excitement or stress
+        [-np.inf, -np.inf, -np.inf, -np.inf],  # low energy: sadness or calmness
+        [-np.inf, 0.1, -np.inf, -np.inf],      # high zero crossing rate: stress or anger
+        [-np.inf, -np.inf, 2000.0, -np.inf]    # high spectral centroid: excitement
+    ])
+    _EMOTION_UPPER = np.array([
+        [np.inf, np.inf, np.inf, np.inf],
+        [0.05, np.inf, np.inf, np.inf],
+        [np.inf, np.inf, np.inf, np.inf],
+        [np.inf, np.inf, np.inf, np.inf]
+    ])
+    _EMOTION_WEIGHTS = np.array([
+        # calm, stressed, excited, sad, angry
+        [0.0, 0.2, 0.3, 0.0, 0.0],
+        [0.2, 0.0, 0.0, 0.3, 0.0],
+        [0.0, 0.2, 0.0, 0.0, 0.1],
+        [0.0, 0.0, 0.2, 0.0, 0.0]
+    ])
+    
+    # Voice characteristics: (name, feature, lower bound, upper bound, labels for values
+    # below the lower bound / between the bounds / above the upper bound)
+    _VOICE_SCALES = (
+        ("pitch_range", "spectral_centroid", 1500.0, 2500.0, ("low", "medium", "high")),  # centroid as pitch proxy
+        ("speech_rate", "tempo", 100.0, 150.0, ("slow", "normal", "fast")),  # tempo as speech rate proxy
+        ("volume_level", "rms_energy", 0.05, 0.1, ("quiet", "normal", "loud")),
+        ("voice_quality", "zero_crossing_rate", 0.1, 0.1, ("smooth", "smooth", "rough"))
+    )
+    _VOICE_FEATURES = tuple(scale[1] for scale in _VOICE_SCALES)
+    
+    def __init__(self, model_size: str = "base", use_fp16: Optional[bool] = None,
+                 backend: str = "openai", compile_encoder: bool = False):
         """
         Initialize audio processor
         
         Args:
             model_size: Whisper model size (tiny, base, small, medium, large)
+            use_fp16: Run inference in half precision (defaults to True on CUDA, False on CPU)
+            backend: "openai" for openai-whisper, or "faster" for the CTranslate2-based
+                faster-whisper package (int8 kernels, must be installed separately)
+            compile_encoder: torch.compile the openai-whisper encoder on CUDA; the first
+                transcription pays the compile time, later ones run fused kernels
         """
         self.model_size = model_size
+        self.backend = backend
+        self.compile_encoder = compile_encoder
         self.whisper_model = None
-        self._load_whisper_model()
+        self.device = "cuda" if settings.USE_CUDA and torch.cuda.is_available() else "cpu"
+        # FP16 halves memory traffic on GPU; CPU inference stays in FP32 for compatibility
+        self.fp16 = (self.device == "cuda") if use_fp16 is None else use_fp16
+        
+        # digest -> features, so the analyzers below decode and analyze each clip once
+        self._feature_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._feature_cache_lock = threading.Lock()
+        
+        # (digest, requested sample rate) -> (waveform, sample rate), shared by
+        # transcription, language detection, feature extraction and validation
+        self._decode_cache: "OrderedDict[Tuple[bytes, Optional[int]], Tuple[np.ndarray, int]]" = OrderedDict()
+        self._decode_cache_lock = threading.Lock()
+        
+        # Weights are loaded on first transcription, so callers that only analyze
+        # or validate audio never pay for them
+        self._model_lock = threading.Lock()
+        self._load_failed_at: Optional[float] = None
+        
+        # Log-mel buffer, STFT window and mel filters reused by every detect_language
+        # call; allocated on the model's device on first use
+        self._mel_buffer: Optional[torch.Tensor] = None
+        self._mel_window: Optional[torch.Tensor] = None
+        self._mel_filters: Optional[torch.Tensor] = None
+        self._mel_lock = threading.Lock()
     
     def _load_whisper_model(self):
         """Load Whisper model"""
         try:
-            self.whisper_model = whisper.load_model(self.model_size)
+            if self.backend == "faster":
+                from faster_whisper import WhisperModel
+                
+                compute_type = "int8_float16" if self.device == "cuda" and self.fp16 else "int8"
+                self.whisper_model = WhisperModel(self.model_size, device=self.device, compute_type=compute_type)
+            else:
+                self.whisper_model = whisper.load_model(self.model_size, device=self.device)
+                
+                # The encoder always sees one 30 s mel window, so its CUDA graph is captured
+                # once and replayed without per-op dispatch
+                if self.compile_encoder and self.device == "cuda":
+                    self.whisper_model.encoder = torch.compile(self.whisper_model.encoder, mode="reduce-overhead")
+            self._load_failed_at = None
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
             self.whisper_model = None
+            self._load_failed_at = time.monotonic()
+    
+    def _ensure_model(self) -> bool:
+        """
+        Load the Whisper model on first use; returns whether it is available
+        
+        After a failed load, requests fail fast for MODEL_RETRY_INTERVAL seconds
+        instead of each reloading the model behind the lock.
+        """
+        if self.whisper_model is None and not self._in_retry_backoff():
+            with self._model_lock:
+                if self.whisper_model is None and not self._in_retry_backoff():
+                    self._load_whisper_model()
+        return self.whisper_model is not None
+    
+    def _in_retry_backoff(self) -> bool:
+        """Whether the last model load failed less than MODEL_RETRY_INTERVAL seconds ago"""
+        failed_at = self._load_failed_at
+        return failed_at is not None and time.monotonic() - failed_at < self.MODEL_RETRY_INTERVAL
     
-    def transcribe_audio(self, audio_data: bytes, language: str = None) -> Dict[str, Any]:
+    def _decode_audio(self, audio_data: bytes, sample_rate: int) -> np.ndarray:
+        """
+        Decode audio bytes to a mono float32 waveform with ffmpeg
+        
+        The bytes are piped through ffmpeg in memory, so no temporary file is written.
+        
+        Args:
+            audio_data: Encoded audio data as bytes
+            sample_rate: Sample rate ffmpeg resamples to
+            
+        Returns:
+            Waveform normalized to [-1, 1]
+        """
+        cmd = [
+            "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+            "pipe:1"
+        ]
+        try:
+            proc = subprocess.run(cmd, input=audio_data, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+        
+        return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+    
+    @staticmethod
+    def _digest(audio_data: Union[bytes, np.ndarray]) -> bytes:
+        """Content digest of encoded audio bytes or of a decoded waveform"""
+        if isinstance(audio_data, np.ndarray):
+            return b"pcm:" + hashlib.blake2b(np.ascontiguousarray(audio_data, dtype=np.float32),
+                                             digest_size=16).digest()
+        return hashlib.blake2b(audio_data, digest_size=16).digest()
+    
+    def _load_audio(self, audio_data: Union[bytes, np.ndarray],
+                    target_sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Decode audio to a mono float32 waveform, once per clip
+        
+        Bytes are read through soundfile (libsndfile) directly, falling back to
+        an ffmpeg pipe for formats libsndfile cannot decode. The native-rate
+        decode and each resampled version are kept in a small LRU, so
+        transcribing and analyzing the same clip decode it only once.
+        
+        Args:
+            audio_data: Encoded audio data as bytes, or a mono waveform at
+                Whisper's 16 kHz sample rate
+            target_sr: Sample rate to resample to (None keeps the native rate)
+            
+        Returns:
+            Tuple of (waveform, sample rate); treat the waveform as read-only
+        """
+        if isinstance(audio_data, np.ndarray):
+            audio, sr = audio_data.astype(np.float32, copy=False), whisper.audio.SAMPLE_RATE
+            if target_sr is not None and sr != target_sr:
+                audio = librosa.resample(audio, orig_sr=sr, target_sr=target_sr, res_type="soxr_hq")
+                sr = target_sr
+            return audio, sr
+        
+        key = (self._digest(audio_data), target_sr)
+        with self._decode_cache_lock:
+            cached = self._decode_cache.get(key)
+            if cached is not None:
+                self._decode_cache.move_to_end(key)
+                return cached
+        
+        if target_sr is None:
+            try:
+                audio, sr = soundfile.read(io.BytesIO(audio_data), dtype="float32", always_2d=False)
+                
+                # Downmix to mono
+                if audio.ndim > 1:
+                    audio = audio.mean(axis=1)
+            except Exception:
+                # ffmpeg reads what libsndfile cannot (webm, m4a, ...) at Whisper's rate
+                sr = whisper.audio.SAMPLE_RATE
+                audio = self._decode_audio(audio_data, sr)
+        else:
+            # Resample from the shared native-rate decode
+            audio, sr = self._load_audio(audio_data)
+            if sr != target_sr:
+                audio = librosa.resample(audio, orig_sr=sr, target_sr=target_sr, res_type="soxr_hq")
+                sr = target_sr
+        
+        with self._decode_cache_lock:
+            self._decode_cache[key] = (audio, sr)
+            if len(self._decode_cache) > self.DECODE_CACHE_SIZE:
+                self._decode_cache.popitem(last=False)
+        
+        return audio, sr
+    
+    def transcribe_audio(self, audio_data: Union[bytes, np.ndarray], language: str = None) -> Dict[str, Any]:
         """
         Transcribe audio to text using Whisper
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Audio data as bytes, or a mono waveform at 16 kHz
             language: Expected language (optional)
             
         Returns:
             Dictionary with transcription and metadata
         """
-        if not self.whisper_model:
+        if not self._ensure_model():
             return {
                 "text": "",
                 "error": "Whisper model not loaded",
@@ -50,20 +256,17 @@ class AudioProcessor:
             }
         
         try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            # Transcribe using Whisper
-            result = self.whisper_model.transcribe(
-                temp_file_path,
-                language=language,
-                fp16=False  # Use fp32 for better compatibility
-            )
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            # Transcribe using Whisper; the decoded waveform is passed directly,
+            # so Whisper does not spawn its own decoder
+            audio, _ = self._load_audio(audio_data, whisper.audio.SAMPLE_RATE)
+            if self.backend == "faster":
+                result = self._transcribe_faster(audio, language)
+            else:
+                result = self.whisper_model.transcribe(
+                    audio,
+                    language=language,
+                    fp16=self.fp16
+                )
             
             return {
                 "text": result["text"].strip(),
@@ -80,6 +283,43 @@ class AudioProcessor:
                 "confidence": 0.0
             }
     
+    def _transcribe_faster(self, audio: np.ndarray, language: Optional[str]) -> Dict[str, Any]:
+        """
+        Transcribe with the faster-whisper backend
+        
+        Args:
+            audio: Waveform from _decode_audio
+            language: Expected language (optional)
+            
+        Returns:
+            Result shaped like openai-whisper's transcribe output
+        """
+        # Greedy decoding, as openai-whisper's transcribe does by default
+        segments_iter, info = self.whisper_model.transcribe(
+            audio,
+            language=language,
+            beam_size=1,
+            vad_filter=True
+        )
+        
+        segments = [
+            {
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob
+            }
+            for segment in segments_iter
+        ]
+        
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": info.language,
+            "segments": segments
+        }
+    
     def _calculate_confidence(self, whisper_result: Dict[str, Any]) -> float:
         """
         Calculate confidence score from Whisper result
@@ -94,53 +334,49 @@ class AudioProcessor:
         if not segments:
             return 0.0
         
-        # Calculate average confidence from segments
-        total_confidence = 0.0
-        total_duration = 0.0
+        # Duration-weighted average confidence over segments that carry a log probability
+        scored = [segment for segment in segments if "avg_logprob" in segment]
+        logprobs = np.fromiter((segment["avg_logprob"] for segment in scored), dtype=np.float64, count=len(scored))
+        durations = np.fromiter((segment.get("end", 0) - segment.get("start", 0) for segment in scored),
+                                dtype=np.float64, count=len(scored))
         
-        for segment in segments:
-            if "avg_logprob" in segment:
-                # Convert log probability to confidence
-                confidence = min(1.0, max(0.0, np.exp(segment["avg_logprob"])))
-                duration = segment.get("end", 0) - segment.get("start", 0)
-                
-                total_confidence += confidence * duration
-                total_duration += duration
+        # Convert log probabilities to confidences
+        confidences = np.clip(np.exp(logprobs), 0.0, 1.0)
         
+        total_duration = durations.sum()
         if total_duration > 0:
-            return total_confidence / total_duration
+            return float(np.dot(confidences, durations) / total_duration)
         
         return 0.0
     
-    def detect_language(self, audio_data: bytes) -> str:
+    def detect_language(self, audio_data: Union[bytes, np.ndarray]) -> str:
         """
         Detect language from audio
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Audio data as bytes, or a mono waveform at 16 kHz
             
         Returns:
             Detected language code
         """
-        if not self.whisper_model:
+        if not self._ensure_model():
             return "unknown"
         
         try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+            if self.backend == "faster":
+                # faster-whisper detects the language before decoding any segment
+                audio, _ = self._load_audio(audio_data, whisper.audio.SAMPLE_RATE)
+                _, info = self.whisper_model.transcribe(audio, vad_filter=False)
+                return info.language
             
             # Detect language using Whisper
-            audio = whisper.load_audio(temp_file_path)
+            audio, _ = self._load_audio(audio_data, whisper.audio.SAMPLE_RATE)
             audio = whisper.pad_or_trim(audio)
             
-            # Get language detection
-            mel = whisper.log_mel_spectrogram(audio).to(self.whisper_model.device)
-            _, probs = self.whisper_model.detect_language(mel)
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            # Get language detection; the buffer is shared, so hold it until the model has read it
+            with self._mel_lock:
+                mel = self._log_mel_spectrogram(audio)
+                _, probs = self.whisper_model.detect_language(mel)
             
             # Return most likely language
             return max(probs, key=probs.get)
@@ -149,33 +385,115 @@ class AudioProcessor:
             print(f"Language detection error: {e}")
             return "unknown"
     
-    def extract_audio_features(self, audio_data: bytes) -> Dict[str, Any]:
+    def _log_mel_spectrogram(self, audio: np.ndarray) -> torch.Tensor:
+        """
+        whisper.log_mel_spectrogram of a 30 s window, written into a reused buffer
+        
+        The samples are moved to the model's device before the STFT, and the mel
+        projection and normalization run in place on the preallocated
+        (n_mels, N_FRAMES) tensor. Callers must hold _mel_lock.
+        
+        Args:
+            audio: Waveform padded or trimmed to whisper.audio.N_SAMPLES
+            
+        Returns:
+            The shared log-mel buffer
+        """
+        device = self.whisper_model.device
+        if self._mel_buffer is None:
+            n_mels = self.whisper_model.dims.n_mels
+            self._mel_buffer = torch.empty(n_mels, whisper.audio.N_FRAMES, device=device)
+            self._mel_window = torch.hann_window(whisper.audio.N_FFT, device=device)
+            self._mel_filters = whisper.audio.mel_filters(device, n_mels)
+        
+        samples = torch.from_numpy(audio).to(device, non_blocking=True)
+        stft = torch.stft(samples, whisper.audio.N_FFT, whisper.audio.HOP_LENGTH,
+                          window=self._mel_window, return_complex=True)
+        magnitudes = stft[..., :-1].abs() ** 2
+        
+        # Same steps as whisper.log_mel_spectrogram, without allocating the result
+        mel = self._mel_buffer
+        torch.matmul(self._mel_filters, magnitudes, out=mel)
+        mel.clamp_(min=1e-10).log10_()
+        torch.maximum(mel, mel.max() - 8.0, out=mel)
+        mel.add_(4.0).div_(4.0)
+        
+        return mel
+    
+    def extract_audio_features(self, audio_data: Union[bytes, np.ndarray],
+                               features: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         Extract audio features for analysis
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Audio data as bytes, or a mono waveform at 16 kHz
+            features: Names from AUDIO_FEATURES to compute (all of them by default);
+                duration and sample_rate are always included
             
         Returns:
             Dictionary of audio features
         """
+        if features is None:
+            requested = self.AUDIO_FEATURES
+        else:
+            wanted = set(features)
+            requested = tuple(name for name in self.AUDIO_FEATURES if name in wanted)
+        
+        key = self._digest(audio_data)
+        with self._feature_cache_lock:
+            cached = self._feature_cache.get(key) or {}
+            if cached:
+                self._feature_cache.move_to_end(key)
+        missing = [name for name in requested if name not in cached]
+        
+        if cached and not missing:
+            return {name: cached[name] for name in ("duration", "sample_rate", *requested)}
+        
         try:
-            # Load audio using librosa
-            audio, sr = librosa.load(io.BytesIO(audio_data), sr=None)
-            
-            # Extract features
-            features = {
-                "duration": len(audio) / sr,
-                "sample_rate": sr,
-                "rms_energy": float(np.sqrt(np.mean(audio**2))),
-                "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(audio))),
-                "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))),
-                "spectral_rolloff": float(np.mean(librosa.feature.spectral_rolloff(y=audio, sr=sr))),
-                "mfcc": librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13).mean(axis=1).tolist(),
-                "tempo": float(librosa.beat.tempo(y=audio, sr=sr)[0]) if len(audio) > 0 else 0.0
+            # Load audio
+            audio, sr = self._load_audio(audio_data)
+            
+            # One magnitude STFT shared by the spectral features; the MFCCs and the
+            # tempo's onset envelope use the log-power mel spectrogram derived from it,
+            # as librosa does by default. Both are computed only if a requested feature needs them.
+            spectra = {}
+            
+            def magnitude() -> np.ndarray:
+                if "magnitude" not in spectra:
+                    spectra["magnitude"] = np.abs(librosa.stft(audio, n_fft=2048, hop_length=512))
+                return spectra["magnitude"]
+            
+            def log_mel() -> np.ndarray:
+                if "log_mel" not in spectra:
+                    spectra["log_mel"] = librosa.power_to_db(
+                        librosa.feature.melspectrogram(S=magnitude()**2, sr=sr, n_mels=128)
+                    )
+                return spectra["log_mel"]
+            
+            extractors = {
+                "rms_energy": lambda: self._rms(audio),
+                "zero_crossing_rate": lambda: self._zero_crossing_rate(audio),
+                "spectral_centroid": lambda: float(np.mean(librosa.feature.spectral_centroid(S=magnitude(), sr=sr))),
+                "spectral_rolloff": lambda: float(np.mean(librosa.feature.spectral_rolloff(S=magnitude(), sr=sr))),
+                "mfcc": lambda: self._mean_mfcc(log_mel(), n_mfcc=13).tolist(),
+                "tempo": lambda: self._estimate_tempo(log_mel(), sr) if len(audio) > 0 else 0.0
             }
             
-            return features
+            # Extract the features not already cached for this clip
+            extracted = dict(cached)
+            extracted["duration"] = len(audio) / sr
+            extracted["sample_rate"] = sr
+            for name in missing:
+                extracted[name] = extractors[name]()
+            
+            # Remember the result (failed extractions are not cached)
+            with self._feature_cache_lock:
+                self._feature_cache[key] = extracted
+                self._feature_cache.move_to_end(key)
+                if len(self._feature_cache) > self.FEATURE_CACHE_SIZE:
+                    self._feature_cache.popitem(last=False)
+            
+            return {name: extracted[name] for name in ("duration", "sample_rate", *requested)}
             
         except Exception as e:
             return {
@@ -184,62 +502,85 @@ class AudioProcessor:
                 "sample_rate": 0
             }
     
-    def detect_emotion_from_audio(self, audio_data: bytes) -> Dict[str, Any]:
+    def extract_audio_features_batch(self, audio_clips: List[Union[bytes, np.ndarray]]) -> List[Dict[str, Any]]:
+        """
+        Extract audio features for several clips in parallel
+        
+        Clips are independent and the decoding, FFT and resampling code releases
+        the GIL, so each clip runs on its own worker thread.
+        
+        Args:
+            audio_clips: Audio data for each clip, as bytes or mono waveforms at 16 kHz
+            
+        Returns:
+            List of feature dictionaries, in the order of audio_clips
+        """
+        max_workers = max(1, min(os.cpu_count() or 1, len(audio_clips)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.extract_audio_features, audio_clips))
+    
+    @staticmethod
+    def _rms(audio: np.ndarray) -> float:
+        """Root mean square of the signal, from one dot product instead of squaring a copy"""
+        if audio.size == 0:
+            return 0.0
+        return float(np.sqrt(np.dot(audio, audio) / audio.size))
+    
+    @staticmethod
+    def _zero_crossing_rate(audio: np.ndarray) -> float:
+        """Fraction of adjacent samples that change sign, over the whole signal"""
+        if len(audio) < 2:
+            return 0.0
+        
+        # Like librosa, samples within 1e-10 of zero count as positive
+        negative = audio < -1e-10
+        return float(np.count_nonzero(negative[1:] != negative[:-1]) / len(audio))
+    
+    @staticmethod
+    def _mean_mfcc(log_mel: np.ndarray, n_mfcc: int) -> np.ndarray:
+        """
+        Mean MFCC vector over all frames, equal to librosa.feature.mfcc(S=log_mel).mean(axis=1)
+        
+        The DCT is linear, so the mean of the per-frame coefficients is the DCT
+        of the mean log-mel frame; only one n_mels-long transform is computed.
+        """
+        return dct(log_mel.mean(axis=1), type=2, norm="ortho")[:n_mfcc]
+    
+    @staticmethod
+    def _estimate_tempo(log_mel: np.ndarray, sr: int) -> float:
+        """Global tempo in BPM from an onset envelope over the precomputed log-mel spectrogram"""
+        onset_envelope = librosa.onset.onset_strength(S=log_mel, sr=sr, hop_length=512)
+        return float(librosa.beat.tempo(onset_envelope=onset_envelope, sr=sr, hop_length=512)[0])
+    
+    def detect_emotion_from_audio(self, audio_data: Union[bytes, np.ndarray]) -> Dict[str, Any]:
         """
         Detect emotion from audio features
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Audio data as bytes, or a mono waveform at 16 kHz
             
         Returns:
             Dictionary with emotion analysis
         """
-        features = self.extract_audio_features(audio_data)
+        features = self.extract_audio_features(audio_data, self._EMOTION_FEATURES)
         
         if "error" in features:
             return {"error": features["error"]}
         
-        # Simple emotion detection based on audio features
-        emotion_scores = {
-            "calm": 0.0,
-            "stressed": 0.0,
-            "excited": 0.0,
-            "sad": 0.0,
-            "angry": 0.0
-        }
-        
-        # Analyze features for emotion indicators
-        rms_energy = features["rms_energy"]
-        zero_crossing_rate = features["zero_crossing_rate"]
-        spectral_centroid = features["spectral_centroid"]
-        tempo = features["tempo"]
-        
-        # High energy and tempo might indicate excitement or stress
-        if rms_energy > 0.1 and tempo > 120:
-            emotion_scores["excited"] += 0.3
-            emotion_scores["stressed"] += 0.2
-        
-        # Low energy might indicate sadness or calmness
-        if rms_energy < 0.05:
-            emotion_scores["sad"] += 0.3
-            emotion_scores["calm"] += 0.2
-        
-        # High zero crossing rate might indicate stress or anger
-        if zero_crossing_rate > 0.1:
-            emotion_scores["stressed"] += 0.2
-            emotion_scores["angry"] += 0.1
-        
-        # High spectral centroid might indicate excitement
-        if spectral_centroid > 2000:
-            emotion_scores["excited"] += 0.2
+        # Simple emotion detection based on audio features: evaluate every rule at
+        # once and sum the weights of the ones that fire
+        values = np.array([features[name] for name in self._EMOTION_FEATURES])
+        fired = np.all((values > self._EMOTION_LOWER) & (values < self._EMOTION_UPPER), axis=1)
+        scores = fired.astype(np.float64) @ self._EMOTION_WEIGHTS
         
         # Normalize scores
-        total_score = sum(emotion_scores.values())
+        total_score = scores.sum()
         if total_score > 0:
-            emotion_scores = {k: v / total_score for k, v in emotion_scores.items()}
+            scores = scores / total_score
         
         # Get dominant emotion
-        dominant_emotion = max(emotion_scores, key=emotion_scores.get)
+        emotion_scores = dict(zip(self._EMOTIONS, scores.tolist()))
+        dominant_emotion = self._EMOTIONS[int(np.argmax(scores))]
         
         return {
             "emotions": emotion_scores,
@@ -247,107 +588,77 @@ class AudioProcessor:
             "confidence": emotion_scores[dominant_emotion]
         }
     
-    def detect_voice_characteristics(self, audio_data: bytes) -> Dict[str, Any]:
+    def detect_voice_characteristics(self, audio_data: Union[bytes, np.ndarray]) -> Dict[str, Any]:
         """
         Detect voice characteristics
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Audio data as bytes, or a mono waveform at 16 kHz
             
         Returns:
             Dictionary with voice characteristics
         """
-        features = self.extract_audio_features(audio_data)
+        features = self.extract_audio_features(audio_data, self._VOICE_FEATURES)
         
         if "error" in features:
             return {"error": features["error"]}
         
-        # Analyze voice characteristics
+        # Analyze voice characteristics: bucket each feature against its bounds
         characteristics = {
-            "pitch_range": "unknown",
-            "speech_rate": "unknown",
-            "volume_level": "unknown",
-            "voice_quality": "unknown"
+            name: labels[(features[feature] >= lower) + (features[feature] > upper)]
+            for name, feature, lower, upper, labels in self._VOICE_SCALES
         }
         
-        # Analyze pitch (using spectral centroid as proxy)
-        spectral_centroid = features["spectral_centroid"]
-        if spectral_centroid > 2500:
-            characteristics["pitch_range"] = "high"
-        elif spectral_centroid < 1500:
-            characteristics["pitch_range"] = "low"
-        else:
-            characteristics["pitch_range"] = "medium"
-        
-        # Analyze speech rate (using tempo as proxy)
-        tempo = features["tempo"]
-        if tempo > 150:
-            characteristics["speech_rate"] = "fast"
-        elif tempo < 100:
-            characteristics["speech_rate"] = "slow"
-        else:
-            characteristics["speech_rate"] = "normal"
-        
-        # Analyze volume
-        rms_energy = features["rms_energy"]
-        if rms_energy > 0.1:
-            characteristics["volume_level"] = "loud"
-        elif rms_energy < 0.05:
-            characteristics["volume_level"] = "quiet"
-        else:
-            characteristics["volume_level"] = "normal"
-        
-        # Analyze voice quality
-        zero_crossing_rate = features["zero_crossing_rate"]
-        if zero_crossing_rate > 0.1:
-            characteristics["voice_quality"] = "rough"
-        else:
-            characteristics["voice_quality"] = "smooth"
-        
         return characteristics
     
-    def preprocess_audio(self, audio_data: bytes, target_sr: int = 16000) -> bytes:
+    def preprocess_audio(self, audio_data: Union[bytes, np.ndarray], target_sr: int = 16000) -> bytes:
         """
         Preprocess audio for better transcription
         
         Args:
-            audio_data: Input audio data
+            audio_data: Input audio data as bytes, or a mono waveform at 16 kHz
             target_sr: Target sample rate
             
         Returns:
-            Preprocessed audio data
+            Preprocessed audio as 16-bit PCM WAV bytes at target_sr
         """
         try:
             # Load audio
-            audio, sr = librosa.load(io.BytesIO(audio_data), sr=target_sr)
+            audio, sr = self._load_audio(audio_data, target_sr)
             
-            # Normalize audio
-            audio = librosa.util.normalize(audio)
+            # Normalize audio to a peak of 1; the peak comes from max/min, which
+            # avoids an abs() copy, and the division makes the one new array
+            # (the decoded waveform is cached and must not change)
+            peak = max(float(audio.max()), -float(audio.min()))
+            if peak > np.finfo(np.float32).tiny:
+                audio = audio / peak
             
             # Remove silence
             audio, _ = librosa.effects.trim(audio, top_db=20)
             
-            # Convert back to bytes
-            audio_bytes = (audio * 32767).astype(np.int16).tobytes()
+            # Encode as a WAV container so the sample rate travels with the samples;
+            # libsndfile converts to 16-bit PCM while writing
+            buffer = io.BytesIO()
+            soundfile.write(buffer, audio, target_sr, subtype="PCM_16", format="WAV")
             
-            return audio_bytes
+            return buffer.getvalue()
             
         except Exception as e:
             print(f"Audio preprocessing error: {e}")
             return audio_data
     
-    def validate_audio(self, audio_data: bytes) -> Dict[str, Any]:
+    def validate_audio(self, audio_data: Union[bytes, np.ndarray]) -> Dict[str, Any]:
         """
         Validate audio data quality
         
         Args:
-            audio_data: Audio data to validate
+            audio_data: Audio data to validate, as bytes or a mono waveform at 16 kHz
             
         Returns:
             Validation results
         """
         try:
-            audio, sr = librosa.load(io.BytesIO(audio_data), sr=None)
+            audio, sr = self._load_audio(audio_data)
             
             validation = {
                 "valid": True,
@@ -371,7 +682,7 @@ class AudioProcessor:
                 validation["valid"] = False
             
             # Check for silence
-            rms_energy = np.sqrt(np.mean(audio**2))
+            rms_energy = self._rms(audio)
             if rms_energy < 0.001:
                 validation["issues"].append("Audio appears to be silent")
                 validation["valid"] = False